@@ -61,7 +61,7 @@ class AddCommand(BaseCommand):
                 if self.config.fuzzy_available:
                     console.print("[dim]💡 Tip: Make sure the path is correct. Fuzzy matching is enabled.[/dim]")
                 else:
-                    console.print("[dim]💡 Tip: Install 'thefuzz' for fuzzy path matching support.[/dim]")
+                    console.print("[dim]💡 Tip: Install 'rapidfuzz' for fuzzy path matching support.[/dim]")
                 return CommandResult.failure("Path not found")
         
         # 3. Add to context
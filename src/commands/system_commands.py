@@ -184,7 +184,7 @@ class FuzzyCommand(BaseCommand):
         console = get_console()
 
         if not self.config.fuzzy_available:
-            console.print("[bold red]✗[/bold red] Fuzzy matching is not available. Install 'thefuzz' package.")
+            console.print("[bold red]✗[/bold red] Fuzzy matching is not available. Install 'rapidfuzz' package.")
             return CommandResult.failure("Fuzzy matching not available")
 
         # Toggle fuzzy mode
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+"""
+JSON helpers for Kimi Assistant
+
+Uses orjson when it is installed (pip install "grok[fast]") and falls back
+to the standard library. For the data this tool serializes (strings,
+integers, booleans, None, and lists and dicts with string keys) dumps
+gives the same text on both backends. Objects orjson rejects, such as
+dicts with non-string keys or integers beyond 64 bits, are serialized by
+the standard library instead. Differences that remain with orjson: floats
+use its shortest form (1e16 rather than 1e+16, 1.5e-7 rather than
+1.5e-07), and NaN and infinities become null rather than NaN/Infinity.
+"""
+
+import re
+import json
+from typing import Any, Union
+
+# orjson's decode error subclasses this, so one except clause covers both backends
+JSONDecodeError = json.JSONDecodeError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Characters that json.dumps escapes by default and orjson never escapes
+_NON_ASCII_RE = re.compile('[^\x00-\x7f]')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document.
+    
+    Args:
+        data: JSON text or UTF-8 encoded bytes
+        
+    Returns:
+        Parsed Python object
+        
+    Raises:
+        JSONDecodeError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _escape_non_ascii(match: re.Match) -> str:
+    """Escape one non-ASCII character the way json.dumps does."""
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return '\\u%04x\\u%04x' % (0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+    return '\\u%04x' % code
+
+
+def dumps(obj: Any, pretty: bool = False, ensure_ascii: bool = True) -> str:
+    """
+    Serialize an object to JSON text.
+    
+    Args:
+        obj: Object to serialize
+        pretty: Indent nested structures by two spaces, like
+            json.dumps(indent=2); otherwise the output is compact, without
+            the spaces json.dumps puts after separators by default
+        ensure_ascii: Escape non-ASCII characters as \\uXXXX, like json.dumps
+            does by default
+        
+    Returns:
+        JSON text
+    """
+    if orjson is not None:
+        try:
+            text = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+        except TypeError:
+            # e.g. non-string dict keys or big integers; json.dumps handles
+            # those or raises its own TypeError
+            text = None
+        if text is not None:
+            # Non-ASCII characters only occur inside strings, so escaping them
+            # afterwards gives the same text as json.dumps
+            if ensure_ascii and not text.isascii():
+                text = _NON_ASCII_RE.sub(_escape_non_ascii, text)
+            return text
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=ensure_ascii)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=ensure_ascii)
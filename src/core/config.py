@@ -8,14 +8,137 @@ and provides dependency injection for configuration values.
 """
 
 import os
-import json
+import sys
 import platform
+import functools
 from pathlib import Path
-from typing import Dict, Any, Set, Optional
+from types import MappingProxyType
+from typing import Dict, Any, FrozenSet, Mapping, Optional
 from dataclasses import dataclass, field
+
+from . import _fastjson
 # Removed xAI SDK import - now using Groq JSON schema format
 
 
+# config.json and system_prompt.txt at the project root
+_DEFAULT_CONFIG_PATH = Path(__file__).parent.parent.parent / "config.json"
+_SYSTEM_PROMPT_PATH = Path(__file__).parent.parent.parent / "system_prompt.txt"
+
+
+@functools.lru_cache(maxsize=4)
+def _read_prompt_template(path_str: str, mtime_ns: int, size: int) -> str:
+    """
+    Read a system prompt template, memoized on its path, mtime and size.
+    
+    Args:
+        path_str: Path to the template file
+        mtime_ns: Modification time of the file (cache key only)
+        size: Size of the file (cache key only)
+        
+    Returns:
+        Template text with surrounding whitespace stripped
+    """
+    return Path(path_str).read_text(encoding='utf-8').strip()
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(path_str: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+    """
+    Parse a config file, memoized on its path, mtime and size.
+    
+    Args:
+        path_str: Path to the config file
+        mtime_ns: Modification time of the file (cache key only)
+        size: Size of the file (cache key only)
+        
+    Returns:
+        Parsed configuration (shared; do not mutate), or None if the JSON is invalid
+    """
+    try:
+        return _fastjson.loads(Path(path_str).read_bytes())
+    except _fastjson.JSONDecodeError:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def _get_os_info() -> Dict[str, Any]:
+    """
+    Detect platform information once per process.
+    
+    Returns:
+        OS facts shared by every Config; copy before mutating
+    """
+    if hasattr(os, 'uname'):
+        # One syscall on POSIX; platform.processor() would spawn `uname -p`
+        uname = os.uname()
+        system, release, version, machine = uname.sysname, uname.release, uname.version, uname.machine
+        processor = machine
+    else:
+        system, release, version = platform.system(), platform.release(), platform.version()
+        machine, processor = platform.machine(), platform.processor()
+    
+    return {
+        'system': system,
+        'release': release,
+        'version': version,
+        'machine': machine,
+        'processor': processor,
+        'python_version': platform.python_version(),
+        'is_windows': system == "Windows",
+        'is_mac': system == "Darwin",
+        'is_linux': system == "Linux",
+    }
+
+
+# Context window assumed for models missing from MODEL_CONTEXT_LIMITS
+DEFAULT_CONTEXT_LIMIT = 128000
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigDefaults:
+    """
+    Built-in settings shared by every Config instance.
+    
+    Only read-only values live here, so one module-level instance can be
+    shared instead of rebuilding the sets and mappings per Config.
+    """
+    
+    excluded_files: FrozenSet[str]
+    excluded_extensions: FrozenSet[str]
+    model_context_limits: Mapping[str, int]
+
+
+CONFIG_DEFAULTS = ConfigDefaults(
+    excluded_files=frozenset(map(sys.intern, {
+        ".DS_Store", "Thumbs.db", ".gitignore", ".python-version", "uv.lock", 
+        ".uv", "uvenv", ".uvenv", ".venv", "venv", "__pycache__", ".pytest_cache", 
+        ".coverage", ".mypy_cache", "node_modules", "package-lock.json", "yarn.lock", 
+        "pnpm-lock.yaml", ".next", ".nuxt", "dist", "build", ".cache", ".parcel-cache", 
+        ".turbo", ".vercel", ".output", ".contentlayer", "out", "coverage", 
+        ".nyc_output", "storybook-static", ".env", ".env.local", ".env.development", 
+        ".env.production", ".git", ".svn", ".hg", "CVS"
+    })),
+    excluded_extensions=frozenset(map(sys.intern, {
+        ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg", ".webp", ".avif", 
+        ".mp4", ".webm", ".mov", ".mp3", ".wav", ".ogg", ".zip", ".tar", 
+        ".gz", ".7z", ".rar", ".exe", ".dll", ".so", ".dylib", ".bin", 
+        ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".pyc", 
+        ".pyo", ".pyd", ".egg", ".whl", ".uv", ".uvenv", ".db", ".sqlite", 
+        ".sqlite3", ".log", ".idea", ".vscode", ".map", ".chunk.js", 
+        ".chunk.css", ".min.js", ".min.css", ".bundle.js", ".bundle.css", 
+        ".cache", ".tmp", ".temp", ".ttf", ".otf", ".woff", ".woff2", ".eot"
+    })),
+    model_context_limits=MappingProxyType({
+        "moonshotai/kimi-k2-instruct-0905": 262144,
+        "openai/gpt-oss-120b": 131072,
+        "openai/gpt-oss-20b": 131072,
+        "llama-3.3-70b-versatile": 131072,
+        "llama-3.1-8b-instant": 131072,
+        "groq/compound": 131072,
+    }),
+)
+
+
 @dataclass
 class Config:
     """
@@ -26,6 +149,7 @@ class Config:
     # Core paths
     base_dir: Path = field(default_factory=lambda: Path.cwd())
     config_file: Optional[Path] = None
+    config_path: Optional[Path] = None  # File to load settings from; defaults to config.json at the project root
     
     # Model settings
     default_model: str = "moonshotai/kimi-k2-instruct-0905"
@@ -61,84 +185,65 @@ class Config:
     git_skip_staging: bool = False
     git_branch: Optional[str] = None
     
-    # OS information
-    os_info: Dict[str, Any] = field(default_factory=dict)
+    # Preferred shell, memoized by get_shell_for_os
+    _cached_shell: Optional[str] = field(default=None, init=False, repr=False, compare=False)
     
-    # File exclusions
-    excluded_files: Set[str] = field(default_factory=set)
-    excluded_extensions: Set[str] = field(default_factory=set)
+    # File exclusions (frozensets for O(1) membership checks during directory walks)
+    excluded_files: FrozenSet[str] = field(default_factory=frozenset)
+    excluded_extensions: FrozenSet[str] = field(default_factory=frozenset)
     
     # Constants
     ADD_COMMAND_PREFIX: str = "/add "
-    MODEL_CONTEXT_LIMITS: Dict[str, int] = field(default_factory=lambda: {
-        "moonshotai/kimi-k2-instruct-0905": 262144,
-        "openai/gpt-oss-120b": 131072,
-        "openai/gpt-oss-20b": 131072,
-        "llama-3.3-70b-versatile": 131072,
-        "llama-3.1-8b-instant": 131072,
-        "groq/compound": 131072,
-    })
+    MODEL_CONTEXT_LIMITS: Mapping[str, int] = field(default_factory=lambda: CONFIG_DEFAULTS.model_context_limits)
     
     def __post_init__(self):
         """Initialize configuration after object creation."""
-        self._detect_os_info()
         self._load_config_file()
         self._set_default_exclusions()
+        self._freeze_exclusions()
         self._validate_fuzzy_availability()
     
-    def _detect_os_info(self) -> None:
-        """Detect OS information and available shells."""
-        self.os_info = {
-            'system': platform.system(),
-            'release': platform.release(),
-            'version': platform.version(),
-            'machine': platform.machine(),
-            'processor': platform.processor(),
-            'python_version': platform.python_version(),
-            'is_windows': platform.system() == "Windows",
-            'is_mac': platform.system() == "Darwin",
-            'is_linux': platform.system() == "Linux",
+    @functools.cached_property
+    def os_info(self) -> Dict[str, Any]:
+        """OS information and available shells, detected on first access."""
+        os_info = {
+            **_get_os_info(),
             'shell_available': {
                 'bash': False,
                 'powershell': False,
                 'zsh': False,
                 'cmd': False
-            }
+            },
+            'bash_path': None,
+            'powershell_path': None
         }
         
-        # Detect available shells
+        # Publish the dict before shell detection, which reads config.os_info
+        self.__dict__['os_info'] = os_info
         self._detect_available_shells()
+        return os_info
     
     def _detect_available_shells(self) -> None:
         """Detect which shells are available on the system."""
-        import shutil
+        # Import here to avoid circular imports
+        from ..utils.shell_utils import detect_available_shells
         
-        shells = ['bash', 'zsh', 'powershell', 'cmd']
-        for shell in shells:
-            if shell == 'cmd' and self.os_info['is_windows']:
-                # cmd is always available on Windows
-                self.os_info['shell_available'][shell] = True
-            elif shell == 'powershell':
-                # Check for both Windows PowerShell and PowerShell Core
-                self.os_info['shell_available'][shell] = (
-                    shutil.which('powershell') is not None or 
-                    shutil.which('pwsh') is not None
-                )
-            else:
-                self.os_info['shell_available'][shell] = shutil.which(shell) is not None
+        detect_available_shells(self)
     
     def _load_config_file(self) -> None:
         """Load configuration from config.json file."""
+        config_path = Path(self.config_path) if self.config_path is not None else _DEFAULT_CONFIG_PATH
         try:
-            config_path = Path(__file__).parent.parent.parent / "config.json"
-            if config_path.exists():
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-                    self._apply_config_data(config_data)
-                    self.config_file = config_path
-        except (FileNotFoundError, json.JSONDecodeError):
-            # Use defaults if config file doesn't exist or is invalid
-            pass
+            stat_result = config_path.stat()
+            config_data = _load_config_cached(str(config_path), stat_result.st_mtime_ns, stat_result.st_size)
+        except FileNotFoundError:
+            # Use defaults if config file doesn't exist
+            return
+        
+        # Use defaults if config file is invalid
+        if config_data is not None:
+            self._apply_config_data(config_data)
+            self.config_file = config_path
     
     def _apply_config_data(self, config_data: Dict[str, Any]) -> None:
         """Apply configuration data from file."""
@@ -182,40 +287,33 @@ class Config:
         
         # File exclusions
         if 'excluded_files' in config_data:
-            self.excluded_files.update(config_data['excluded_files'])
+            self.excluded_files = self.excluded_files | frozenset(config_data['excluded_files'])
         
         if 'excluded_extensions' in config_data:
-            self.excluded_extensions.update(config_data['excluded_extensions'])
+            self.excluded_extensions = self.excluded_extensions | frozenset(
+                ext.lower() for ext in config_data['excluded_extensions']
+            )
     
     def _set_default_exclusions(self) -> None:
         """Set default file and extension exclusions."""
         if not self.excluded_files:
-            self.excluded_files = {
-                ".DS_Store", "Thumbs.db", ".gitignore", ".python-version", "uv.lock", 
-                ".uv", "uvenv", ".uvenv", ".venv", "venv", "__pycache__", ".pytest_cache", 
-                ".coverage", ".mypy_cache", "node_modules", "package-lock.json", "yarn.lock", 
-                "pnpm-lock.yaml", ".next", ".nuxt", "dist", "build", ".cache", ".parcel-cache", 
-                ".turbo", ".vercel", ".output", ".contentlayer", "out", "coverage", 
-                ".nyc_output", "storybook-static", ".env", ".env.local", ".env.development", 
-                ".env.production", ".git", ".svn", ".hg", "CVS"
-            }
+            self.excluded_files = CONFIG_DEFAULTS.excluded_files
         
         if not self.excluded_extensions:
-            self.excluded_extensions = {
-                ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg", ".webp", ".avif", 
-                ".mp4", ".webm", ".mov", ".mp3", ".wav", ".ogg", ".zip", ".tar", 
-                ".gz", ".7z", ".rar", ".exe", ".dll", ".so", ".dylib", ".bin", 
-                ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".pyc", 
-                ".pyo", ".pyd", ".egg", ".whl", ".uv", ".uvenv", ".db", ".sqlite", 
-                ".sqlite3", ".log", ".idea", ".vscode", ".map", ".chunk.js", 
-                ".chunk.css", ".min.js", ".min.css", ".bundle.js", ".bundle.css", 
-                ".cache", ".tmp", ".temp", ".ttf", ".otf", ".woff", ".woff2", ".eot"
-            }
+            self.excluded_extensions = CONFIG_DEFAULTS.excluded_extensions
+    
+    def _freeze_exclusions(self) -> None:
+        """Store exclusions as frozensets of interned strings, even when plain lists or sets were passed in."""
+        # The shared defaults are already frozen and interned
+        if self.excluded_files is not CONFIG_DEFAULTS.excluded_files:
+            self.excluded_files = frozenset(map(sys.intern, self.excluded_files))
+        if self.excluded_extensions is not CONFIG_DEFAULTS.excluded_extensions:
+            self.excluded_extensions = frozenset(sys.intern(ext.lower()) for ext in self.excluded_extensions)
     
     def _validate_fuzzy_availability(self) -> None:
         """Check if fuzzy matching is available."""
         try:
-            from thefuzz import fuzz, process as fuzzy_process
+            from rapidfuzz import fuzz, process as fuzzy_process
             self.fuzzy_available = True
         except ImportError:
             self.fuzzy_available = False
@@ -225,40 +323,55 @@ class Config:
         """Get the maximum context tokens for a specific model."""
         if model_name is None:
             model_name = self.current_model
-        return self.MODEL_CONTEXT_LIMITS.get(model_name, 128000)
+        return self.MODEL_CONTEXT_LIMITS.get(model_name, DEFAULT_CONTEXT_LIMIT)
     
     def set_base_dir(self, path: Path) -> None:
         """Set the base directory for operations."""
+        # Import here to avoid circular imports
+        from ..utils.path_utils import clear_path_cache
+        
         self.base_dir = path.resolve()
+        clear_path_cache()
+        self._invalidate_system_prompt()
     
     def set_model(self, model_name: str) -> None:
         """Set the current model."""
         self.current_model = model_name
         self.is_reasoner = model_name == self.reasoner_model
+        self._invalidate_system_prompt()
     
     def enable_git(self, branch: Optional[str] = None, skip_staging: bool = False) -> None:
         """Enable git context."""
         self.git_enabled = True
         self.git_branch = branch
         self.git_skip_staging = skip_staging
+        self._invalidate_system_prompt()
     
     def disable_git(self) -> None:
         """Disable git context."""
         self.git_enabled = False
         self.git_branch = None
         self.git_skip_staging = False
+        self._invalidate_system_prompt()
+    
+    @functools.cached_property
+    def system_prompt(self) -> str:
+        """Formatted system prompt, built on first access."""
+        return self._load_and_format_system_prompt()
+    
+    def _invalidate_system_prompt(self) -> None:
+        """Drop the cached system prompt so the next access rebuilds it."""
+        self.__dict__.pop('system_prompt', None)
     
     def get_system_prompt(self) -> str:
         """Get the formatted system prompt."""
-        return self._load_and_format_system_prompt()
+        return self.system_prompt
     
     def _load_system_prompt(self) -> str:
         """Load system prompt from external file."""
         try:
-            prompt_path = Path(__file__).parent.parent.parent / "system_prompt.txt"
-            if prompt_path.exists():
-                with open(prompt_path, 'r', encoding='utf-8') as f:
-                    return f.read().strip()
+            stat_result = _SYSTEM_PROMPT_PATH.stat()
+            return _read_prompt_template(str(_SYSTEM_PROMPT_PATH), stat_result.st_mtime_ns, stat_result.st_size)
         except (FileNotFoundError, IOError):
             pass
         return self._get_default_system_prompt()
@@ -288,10 +401,11 @@ class Config:
         try:
             # Format the template with current context
             formatted_prompt = prompt_template.format(**format_context)
-            return formatted_prompt
         except (KeyError, ValueError):
             # If template formatting fails, fall back to original prompt
-            return prompt_template
+            formatted_prompt = prompt_template
+        
+        return formatted_prompt
     
     def _get_default_system_prompt(self) -> str:
         """Get the default system prompt."""
@@ -351,147 +465,157 @@ IMPORTANT: In your thinking process, if you realize that something requires a to
 Remember: You're a senior engineer - be thoughtful, precise, and explain your reasoning clearly.
 """
     
+    @property
+    def tools(self) -> list:
+        """Function calling tools in JSON schema format for Groq (shared; do not mutate)."""
+        return _TOOLS
+    
     def get_tools(self) -> list:
         """Get the function calling tools definition in JSON schema format for Groq."""
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_file",
-                    "description": "Read the content of a single file from the filesystem",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "The path to the file to read",
-                            },
-                        },
-                        "required": ["file_path"],
+        return self.tools
+
+
+# Function calling tools in JSON schema format for Groq; built once and
+# shared by every Config, so callers must not mutate it
+_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "read_file",
+            "description": "Read the content of a single file from the filesystem",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "The path to the file to read",
                     },
                 },
+                "required": ["file_path"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "read_multiple_files",
-                    "description": "Read the content of multiple files",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_paths": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "Array of file paths to read",
-                            },
-                        },
-                        "required": ["file_paths"],
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_multiple_files",
+            "description": "Read the content of multiple files",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_paths": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Array of file paths to read",
                     },
                 },
+                "required": ["file_paths"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_file",
-                    "description": "Create or overwrite a file",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path for the file",
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "Content for the file",
-                            },
-                        },
-                        "required": ["file_path", "content"],
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_file",
+            "description": "Create or overwrite a file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path for the file",
+                    },
+                    "content": {
+                        "type": "string",
+                        "description": "Content for the file",
                     },
                 },
+                "required": ["file_path", "content"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_multiple_files",
-                    "description": "Create multiple files",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "files": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "path": {"type": "string"},
-                                        "content": {"type": "string"},
-                                    },
-                                    "required": ["path", "content"],
-                                },
-                                "description": "Array of files to create (path, content)",
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_multiple_files",
+            "description": "Create multiple files",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "files": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "path": {"type": "string"},
+                                "content": {"type": "string"},
                             },
+                            "required": ["path", "content"],
                         },
-                        "required": ["files"],
+                        "description": "Array of files to create (path, content)",
                     },
                 },
+                "required": ["files"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "edit_file",
-                    "description": "Edit a file by replacing a snippet (fuzzy matching available with /fuzzy flag)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path to the file",
-                            },
-                            "original_snippet": {
-                                "type": "string",
-                                "description": "Snippet to replace",
-                            },
-                            "new_snippet": {
-                                "type": "string",
-                                "description": "Replacement snippet",
-                            },
-                        },
-                        "required": ["file_path", "original_snippet", "new_snippet"],
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "edit_file",
+            "description": "Edit a file by replacing a snippet (fuzzy matching available with /fuzzy flag)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the file",
+                    },
+                    "original_snippet": {
+                        "type": "string",
+                        "description": "Snippet to replace",
+                    },
+                    "new_snippet": {
+                        "type": "string",
+                        "description": "Replacement snippet",
                     },
                 },
+                "required": ["file_path", "original_snippet", "new_snippet"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "run_powershell",
-                    "description": "Run a PowerShell command with security confirmation (Windows/Cross-platform PowerShell Core).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "command": {
-                                "type": "string",
-                                "description": "The PowerShell command to execute",
-                            },
-                        },
-                        "required": ["command"],
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "run_powershell",
+            "description": "Run a PowerShell command with security confirmation (Windows/Cross-platform PowerShell Core).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "command": {
+                        "type": "string",
+                        "description": "The PowerShell command to execute",
                     },
                 },
+                "required": ["command"],
             },
-            {
-                "type": "function",
-                "function": {
-                    "name": "run_bash",
-                    "description": "Run a bash command with security confirmation (macOS/Linux/WSL).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "command": {
-                                "type": "string",
-                                "description": "The bash command to execute",
-                            },
-                        },
-                        "required": ["command"],
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "run_bash",
+            "description": "Run a bash command with security confirmation (macOS/Linux/WSL).",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "command": {
+                        "type": "string",
+                        "description": "The bash command to execute",
                     },
                 },
+                "required": ["command"],
             },
-        ]
\ No newline at end of file
+        },
+    },
+]
\ No newline at end of file
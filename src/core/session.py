@@ -123,8 +123,8 @@ class KimiSession:
             
             console.print(f"[dim]Model changed to {new_model}...[/dim]")
             self.model = new_model
-            self.is_reasoner = new_model == self.config.reasoner_model
             self.config.set_model(new_model)
+            self.is_reasoner = self.config.is_reasoner
     
     def get_response(self, use_reasoner: bool = False) -> Any:
         """
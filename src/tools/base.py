@@ -6,9 +6,9 @@ Base tool handler for Kimi Assistant
 Provides the foundation for implementing tool handlers.
 """
 
-import json
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
+from ..core import _fastjson
 from ..core.config import Config
 
 
@@ -79,7 +79,7 @@ class ToolExecutor:
             # Handle both string and dict formats for arguments
             if isinstance(arguments, str):
                 # Arguments are JSON string - parse them
-                args = json.loads(arguments)
+                args = _fastjson.loads(arguments)
             elif isinstance(arguments, dict):
                 # Arguments are already parsed - use directly
                 args = arguments
@@ -94,7 +94,7 @@ class ToolExecutor:
             else:
                 return f"Error: Unknown function '{func_name}'. Available functions: {list(self.tools.keys())}"
                 
-        except json.JSONDecodeError as e:
+        except _fastjson.JSONDecodeError as e:
             return f"Error: Invalid JSON in function arguments for '{func_name}': {str(e)}"
         except Exception as e:
             return f"Error executing function '{func_name}': {str(e)}"
\ No newline at end of file
@@ -6,11 +6,11 @@ File operation tools for Kimi Assistant
 Handles file reading, writing, and editing operations.
 """
 
-import json
 from pathlib import Path
 from typing import Any, Dict
 
 from .base import BaseTool, ToolResult
+from ..core import _fastjson
 from ..utils.path_utils import normalize_path
 from ..utils.file_utils import safe_file_read, apply_fuzzy_diff_edit
 
@@ -139,7 +139,7 @@ class ReadMultipleFilesTool(BaseTool):
         response_data["metadata"]["files_read"] = len(response_data["files_read"])
         response_data["metadata"]["files_error"] = len(response_data["errors"])
         
-        return ToolResult.success(json.dumps(response_data, indent=2))
+        return ToolResult.success(_fastjson.dumps(response_data, pretty=True))
 
 
 class CreateFileTool(BaseTool):
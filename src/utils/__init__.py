@@ -5,8 +5,9 @@ Contains utility functions organized by domain.
 """
 
 from .path_utils import (
-    normalize_path, get_directory_tree_summary, is_path_safe,
-    get_relative_path, ensure_directory_exists, is_excluded_file
+    normalize_path, get_directory_tree_summary, get_directory_tree_summary_from_entries,
+    is_path_safe, is_within_base, get_relative_path, ensure_directory_exists,
+    is_excluded_file, file_extension, exclusion_sets, clear_path_cache
 )
 
 from .file_utils import (
@@ -24,13 +25,14 @@ from .text_utils import (
 from .shell_utils import (
     detect_available_shells, run_bash_command, run_powershell_command,
     get_shell_for_os, is_dangerous_command, sanitize_command,
-    validate_working_directory
+    validate_working_directory, clear_which_cache
 )
 
 __all__ = [
     # Path utilities
-    'normalize_path', 'get_directory_tree_summary', 'is_path_safe',
-    'get_relative_path', 'ensure_directory_exists', 'is_excluded_file',
+    'normalize_path', 'get_directory_tree_summary', 'get_directory_tree_summary_from_entries',
+    'is_path_safe', 'is_within_base', 'get_relative_path', 'ensure_directory_exists',
+    'is_excluded_file', 'file_extension', 'exclusion_sets', 'clear_path_cache',
     
     # File utilities
     'is_binary_file', 'detect_file_encoding', 'enhanced_binary_detection',
@@ -45,5 +47,5 @@ __all__ = [
     # Shell utilities
     'detect_available_shells', 'run_bash_command', 'run_powershell_command',
     'get_shell_for_os', 'is_dangerous_command', 'sanitize_command',
-    'validate_working_directory'
+    'validate_working_directory', 'clear_which_cache'
 ]
\ No newline at end of file
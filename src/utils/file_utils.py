@@ -7,12 +7,183 @@ Handles file reading, writing, encoding detection, and fuzzy matching.
 """
 
 import os
+import re
+import stat
+import codecs
+import threading
+import shutil
+import tempfile
 import mimetypes
+import functools
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Any, List, Union
+from typing import Optional, Tuple, Dict, Any, List, Union, Iterator, Iterable, Container
 
 from ..core.config import Config
-from .path_utils import normalize_path
+from .path_utils import normalize_path, file_extension, exclusion_sets
+
+# Prefer the fastest available chardet-compatible detector. The
+# faust-cchardet distribution also installs the ``cchardet`` module.
+# cchardet and chardet expose an incremental UniversalDetector that can
+# stop early, so both are tried first; charset_normalizer only offers
+# one-shot detection and is the last resort.
+_UniversalDetector = None
+_detect_encoding = None
+try:
+    from cchardet import UniversalDetector as _UniversalDetector
+except ImportError:
+    try:
+        from chardet import UniversalDetector as _UniversalDetector
+    except ImportError:
+        try:
+            from charset_normalizer import detect as _detect_encoding
+        except ImportError:
+            pass
+
+# Bytes fed to the incremental encoding detector per step
+_ENCODING_DETECTION_CHUNK_SIZE = 1024
+
+# Bytes read from the start of a file for binary and encoding detection
+_DETECTION_PEEK_SIZE = 8192
+
+# Extensions that are always treated as text, skipping MIME lookup and content analysis
+_TEXT_EXTENSIONS = frozenset({
+    '.py', '.pyi', '.md', '.txt', '.rst', '.json', '.yaml', '.yml', '.toml',
+    '.ini', '.cfg', '.conf', '.csv', '.xml', '.html', '.htm', '.css', '.scss',
+    '.js', '.mjs', '.cjs', '.ts', '.tsx', '.jsx', '.vue', '.svelte',
+    '.c', '.h', '.cc', '.cpp', '.hpp', '.cs', '.rs', '.go', '.java', '.kt',
+    '.swift', '.rb', '.php', '.pl', '.lua', '.r', '.sql', '.sh', '.bash',
+    '.zsh', '.ps1', '.bat', '.cmd', '.dockerfile', '.env', '.gitignore',
+})
+
+# Extensions that are always binary, mapped to their MIME type
+_BINARY_EXTENSIONS = {
+    '.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif', '.bmp': 'image/bmp', '.ico': 'image/vnd.microsoft.icon',
+    '.webp': 'image/webp', '.avif': 'image/avif', '.tiff': 'image/tiff',
+    '.mp4': 'video/mp4', '.webm': 'video/webm', '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo', '.mkv': 'video/x-matroska',
+    '.mp3': 'audio/mpeg', '.wav': 'audio/x-wav', '.ogg': 'audio/ogg', '.flac': 'audio/flac',
+    '.zip': 'application/zip', '.gz': 'application/gzip', '.tar': 'application/x-tar',
+    '.7z': 'application/x-7z-compressed', '.rar': 'application/vnd.rar',
+    '.exe': 'application/octet-stream', '.dll': 'application/octet-stream',
+    '.so': 'application/octet-stream', '.dylib': 'application/octet-stream',
+    '.bin': 'application/octet-stream', '.pyc': 'application/octet-stream',
+    '.pdf': 'application/pdf', '.sqlite': 'application/vnd.sqlite3', '.db': 'application/octet-stream',
+    '.woff': 'font/woff', '.woff2': 'font/woff2', '.ttf': 'font/ttf', '.otf': 'font/otf',
+}
+
+# ASCII printable bytes plus tab, newline and carriage return
+_PRINTABLE_BYTES = bytes(range(32, 127)) + b'\t\n\r'
+
+# Whether files can be stat'ed and opened relative to a directory descriptor
+_DIR_FD_SUPPORTED = (
+    hasattr(os, 'O_DIRECTORY')
+    and os.open in os.supports_dir_fd
+    and os.stat in os.supports_dir_fd
+)
+
+# Detection results per file version, oldest first; see _cached_detection
+_DETECTION_CACHE_MAX_ENTRIES = 4096
+_detection_cache: Dict[Tuple[str, int, int, int, int], Tuple[Dict[str, Any], Optional[str], float]] = {}
+
+# Per-thread count of bytes replaced by the 'counting_replace' error handler
+_decode_errors = threading.local()
+
+# Basename prefilter for fuzzy file matching on large trees
+_FUZZY_PREFILTER_LIMIT = 100
+_FUZZY_PREFILTER_SCORE = 50
+
+
+def _walk_scandir(root: Union[str, Path], excluded_dirs: Container[str],
+                  excluded_exts: Container[str]) -> Iterator[os.DirEntry]:
+    """
+    Walk a directory tree with os.scandir and yield non-excluded files.
+    
+    DirEntry caches the file type reported by the directory listing, so
+    no extra stat call is needed per entry. Symlinked directories are not
+    followed, matching os.walk's default behaviour.
+    
+    Args:
+        root: Root directory to walk
+        excluded_dirs: Names of files and directories to skip
+        excluded_exts: Lowercased extensions to skip
+        
+    Yields:
+        DirEntry objects for included files, directory by directory
+    """
+    for _, entry in _scandir_walk_with_fd(root, excluded_dirs, excluded_exts, open_dirs=False):
+        yield entry
+
+
+def _scandir_walk_with_fd(root: Union[str, Path], excluded_dirs: Container[str],
+                          excluded_exts: Container[str],
+                          open_dirs: bool = True) -> Iterator[Tuple[Optional[int], os.DirEntry]]:
+    """
+    Walk a directory tree like _walk_scandir, also yielding an open directory fd.
+    
+    Each directory is opened once, so files in it can be stat'ed and opened
+    relative to the descriptor (via dir_fd) without the kernel resolving the
+    full path again. The descriptor is only valid until the walk moves on to
+    the next directory. On platforms without dir_fd support, None is yielded.
+    
+    Args:
+        root: Root directory to walk
+        excluded_dirs: Names of files and directories to skip
+        excluded_exts: Lowercased extensions to skip
+        open_dirs: Whether to open directory descriptors at all
+        
+    Yields:
+        Tuples of (dir_fd or None, DirEntry) for included files
+    """
+    open_dirs = open_dirs and _DIR_FD_SUPPORTED
+    stack = [os.fspath(root)]
+    
+    while stack:
+        current = stack.pop()
+        subdirs = []
+        dir_fd = None
+        
+        try:
+            if open_dirs:
+                dir_fd = os.open(current, os.O_RDONLY | os.O_DIRECTORY)
+            
+            with os.scandir(current) as it:
+                for entry in it:
+                    name = entry.name
+                    if name in excluded_dirs:
+                        continue
+                    
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file() and file_extension(name) not in excluded_exts:
+                            yield dir_fd, entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+        
+        # Push in reverse so subdirectories are visited in listing order
+        stack.extend(reversed(subdirs))
+
+
+def _count_printable(chunk: bytes) -> int:
+    """
+    Count ASCII printable bytes plus tab, newline and carriage return.
+    
+    Deleting the printable bytes with bytes.translate runs in C, so this
+    avoids a Python-level loop over every byte.
+    
+    Args:
+        chunk: Bytes to analyze
+        
+    Returns:
+        Number of printable bytes in chunk
+    """
+    return len(chunk) - len(chunk.translate(None, _PRINTABLE_BYTES))
 
 
 def is_binary_file(file_path: str, peek_size: int = 8192) -> bool:
@@ -39,10 +210,7 @@ def is_binary_file(file_path: str, peek_size: int = 8192) -> bool:
             return True
             
         # Check for high percentage of non-printable characters
-        printable_chars = 0
-        for byte in chunk:
-            if 32 <= byte <= 126 or byte in (9, 10, 13):  # ASCII printable + tab/newline/carriage return
-                printable_chars += 1
+        printable_chars = _count_printable(chunk)
         
         # If less than 70% printable characters, consider it binary
         if printable_chars / len(chunk) < 0.70:
@@ -54,49 +222,111 @@ def is_binary_file(file_path: str, peek_size: int = 8192) -> bool:
         return True  # Assume binary if can't read
 
 
-def detect_file_encoding(file_path: str, peek_size: int = 8192) -> Tuple[str, float]:
+def detect_file_encoding(file_path: str, peek_size: int = 8192,
+                         peek: Optional[bytes] = None) -> Tuple[str, float]:
     """
-    Detect file encoding using chardet library or fallback methods.
+    Detect file encoding using an encoding detection library or fallback methods.
     
     Args:
         file_path: Path to the file
         peek_size: Number of bytes to peek at
+        peek: Optional bytes already read from the start of the file
         
     Returns:
         Tuple of (encoding, confidence)
     """
-    try:
-        # Try to import chardet for better encoding detection
-        import chardet
-        
+    if peek is not None:
+        raw_data = peek
+    else:
         with open(file_path, 'rb') as f:
             raw_data = f.read(peek_size)
-            
-        result = chardet.detect(raw_data)
+    
+    # ASCII is a subset of UTF-8, so pure ASCII needs no statistical detection
+    if raw_data.isascii():
+        return 'utf-8', 1.0
+    
+    # Text in other encodings is almost never valid UTF-8, so a strict decode
+    # settles most files before the statistical detectors, which can misread
+    # UTF-8. A multi-byte character cut off by the end of the peek is
+    # accepted unless the peek is the whole file
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(raw_data, final=len(raw_data) < peek_size)
+        return 'utf-8', 0.99
+    except UnicodeDecodeError:
+        pass
+    
+    if _UniversalDetector is not None:
+        # Feed small chunks and stop as soon as the detector is confident
+        detector = _UniversalDetector()
+        for start in range(0, len(raw_data), _ENCODING_DETECTION_CHUNK_SIZE):
+            detector.feed(raw_data[start:start + _ENCODING_DETECTION_CHUNK_SIZE])
+            if detector.done:
+                break
+        detector.close()
+        result = detector.result
         return result['encoding'] or 'utf-8', result['confidence'] or 0.0
+    
+    if _detect_encoding is not None:
+        result = _detect_encoding(raw_data)
+        return result['encoding'] or 'utf-8', result['confidence'] or 0.0
+    
+    # Fallback method without an encoding detection library; an incremental
+    # decoder tolerates a multi-byte sequence cut off at the end of the peek
+    encodings_to_try = ['utf-8', 'utf-16', 'latin-1', 'cp1252', 'ascii']
+    
+    for encoding in encodings_to_try:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(raw_data)
+            return encoding, 0.8  # Reasonable confidence for successful decode
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+    
+    return 'utf-8', 0.1  # Low confidence fallback
+
+
+def _detect_by_extension(file_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Classify a file from its extension alone, without touching the file.
+    
+    Args:
+        file_path: Path to the file
         
-    except ImportError:
-        # Fallback method without chardet
-        encodings_to_try = ['utf-8', 'utf-16', 'latin-1', 'cp1252', 'ascii']
-        
-        for encoding in encodings_to_try:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    f.read(peek_size)
-                return encoding, 0.8  # Reasonable confidence for successful decode
-            except (UnicodeDecodeError, UnicodeError):
-                continue
-        
-        return 'utf-8', 0.1  # Low confidence fallback
+    Returns:
+        Detection result for well-known text or binary extensions, else None
+    """
+    extension = file_extension(os.path.basename(file_path))
+    
+    if extension in _TEXT_EXTENSIONS:
+        return {
+            'is_binary': False,
+            'file_type': 'text',
+            'mime_type': 'text/plain',
+            'confidence': 0.95,
+            'analysis': {}
+        }
+    
+    mime_type = _BINARY_EXTENSIONS.get(extension)
+    if mime_type is not None:
+        return {
+            'is_binary': True,
+            'file_type': mime_type.split('/')[0],
+            'mime_type': mime_type,
+            'confidence': 0.95,
+            'analysis': {}
+        }
+    
+    return None
 
 
-def enhanced_binary_detection(file_path: str, peek_size: int = 8192) -> Dict[str, Any]:
+def enhanced_binary_detection(file_path: str, peek_size: int = 8192,
+                              peek: Optional[bytes] = None) -> Dict[str, Any]:
     """
     Enhanced binary file detection with detailed analysis.
     
     Args:
         file_path: Path to the file
         peek_size: Number of bytes to peek at
+        peek: Optional bytes already read from the start of the file
         
     Returns:
         Dictionary with detection results
@@ -109,6 +339,11 @@ def enhanced_binary_detection(file_path: str, peek_size: int = 8192) -> Dict[str
         'analysis': {}
     }
     
+    # Well-known extensions need neither a MIME lookup nor a peek read
+    extension_result = _detect_by_extension(file_path)
+    if extension_result is not None:
+        return extension_result
+    
     try:
         # Get MIME type
         mime_type, _ = mimetypes.guess_type(file_path)
@@ -123,8 +358,11 @@ def enhanced_binary_detection(file_path: str, peek_size: int = 8192) -> Dict[str
                 return result
         
         # Read file content for analysis
-        with open(file_path, 'rb') as f:
-            chunk = f.read(peek_size)
+        if peek is not None:
+            chunk = peek
+        else:
+            with open(file_path, 'rb') as f:
+                chunk = f.read(peek_size)
         
         if not chunk:
             result['file_type'] = 'empty'
@@ -135,7 +373,7 @@ def enhanced_binary_detection(file_path: str, peek_size: int = 8192) -> Dict[str
         total_bytes = len(chunk)
         
         # Count printable characters
-        printable = sum(1 for b in chunk if 32 <= b <= 126 or b in (9, 10, 13))
+        printable = _count_printable(chunk)
         printable_ratio = printable / total_bytes if total_bytes > 0 else 0
         
         result['analysis'] = {
@@ -169,7 +407,127 @@ def enhanced_binary_detection(file_path: str, peek_size: int = 8192) -> Dict[str
         return result
 
 
-def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Config = None) -> Dict[str, Any]:
+def _run_detection(file_path: str, dir_fd: Optional[int] = None,
+                   name: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[str], float]:
+    """
+    Run binary and encoding detection for a file.
+    
+    Args:
+        file_path: Normalized path to the file
+        dir_fd: Optional directory descriptor; if given, the peek is read by
+            opening name relative to it rather than by file_path
+        name: Name of the file within dir_fd
+        
+    Returns:
+        Tuple of (detection_result, encoding, confidence); encoding is None
+        for binary files
+    """
+    # Known binary extensions need no peek at all
+    extension_result = _detect_by_extension(file_path)
+    if extension_result is not None and extension_result['is_binary']:
+        return extension_result, None, 0.0
+    
+    # Read the peek once and share it between binary and encoding detection;
+    # on error, binary detection reopens the file and reports the failure
+    try:
+        with open(**_open_args(file_path, dir_fd, name), mode='rb') as f:
+            peek = f.read(_DETECTION_PEEK_SIZE)
+    except OSError:
+        peek = None
+    
+    detection_result = enhanced_binary_detection(file_path, _DETECTION_PEEK_SIZE, peek)
+    if detection_result['is_binary']:
+        return detection_result, None, 0.0
+    
+    encoding, confidence = detect_file_encoding(file_path, _DETECTION_PEEK_SIZE, peek)
+    return detection_result, encoding, confidence
+
+
+def _cached_detection(file_path: str, file_stat: os.stat_result, dir_fd: Optional[int] = None,
+                      name: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[str], float]:
+    """
+    Run binary and encoding detection for a file, memoized per file version.
+    
+    The cache key is the path plus the modification time, size, inode and
+    change time, so an edited or replaced file is detected again even when
+    the edit preserves its size and modification time. dir_fd and name only
+    say how to open the file on a cache miss and are not part of the key,
+    since descriptor numbers are reused once closed. The returned detection
+    dict is shared between callers and must be treated as read-only.
+    
+    Args:
+        file_path: Normalized path to the file
+        file_stat: Result of stat'ing the file
+        dir_fd: Optional directory descriptor to read the peek relative to
+        name: Name of the file within dir_fd
+        
+    Returns:
+        Tuple of (detection_result, encoding, confidence); encoding is None
+        for binary files
+    """
+    key = (file_path, file_stat.st_mtime_ns, file_stat.st_size,
+           file_stat.st_ino, file_stat.st_ctime_ns)
+    result = _detection_cache.get(key)
+    if result is None:
+        result = _run_detection(file_path, dir_fd, name)
+        # Evict the oldest entry; dicts keep insertion order
+        if len(_detection_cache) >= _DETECTION_CACHE_MAX_ENTRIES:
+            _detection_cache.pop(next(iter(_detection_cache), None), None)
+        _detection_cache[key] = result
+    return result
+
+
+def _counting_replace(error: UnicodeError) -> Tuple[str, int]:
+    """Codec error handler that behaves like 'replace' and counts replacements."""
+    _decode_errors.count += 1
+    return codecs.replace_errors(error)
+
+
+codecs.register_error('counting_replace', _counting_replace)
+
+
+def _open_args(file_path: str, dir_fd: Optional[int] = None,
+               name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build keyword arguments for open() that honour an optional directory fd.
+    
+    Args:
+        file_path: Path to the file, used when dir_fd is None
+        dir_fd: Optional directory descriptor to open relative to
+        name: Name of the file within dir_fd (defaults to file_path's base name)
+        
+    Returns:
+        Dictionary with 'file' and 'opener' keys
+    """
+    if dir_fd is None:
+        return {'file': file_path, 'opener': None}
+    return {
+        'file': name if name is not None else os.path.basename(file_path),
+        'opener': lambda path, flags: os.open(path, flags, dir_fd=dir_fd),
+    }
+
+
+def _read_text(file_path: str, encoding: str, dir_fd: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Read and decode a file, replacing undecodable bytes.
+    
+    Args:
+        file_path: Path to the file
+        encoding: Encoding to decode with
+        dir_fd: Optional directory descriptor; if given, the file's base
+            name is opened relative to it
+        
+    Returns:
+        Tuple of (content, number of replaced byte sequences)
+    """
+    _decode_errors.count = 0
+    with open(**_open_args(file_path, dir_fd), mode='r', encoding=encoding, errors='counting_replace') as f:
+        content = f.read()
+    return content, _decode_errors.count
+
+
+def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Config = None,
+                   dir_fd: Optional[int] = None) -> Dict[str, Any]:
     """
     Safely read a file with comprehensive error handling and size limits.
     
@@ -177,6 +535,8 @@ def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Confi
         file_path: Path to the file
         max_size: Maximum file size in bytes
         config: Configuration object
+        dir_fd: Optional descriptor of the directory containing file_path;
+            if given, the file is stat'ed, detected and read relative to it
         
     Returns:
         Dictionary with read results
@@ -197,20 +557,23 @@ def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Confi
         else:
             normalized_path = str(Path(file_path).resolve())
         
-        # Check if file exists
-        if not os.path.exists(normalized_path):
+        # Get file info with a single stat call
+        try:
+            if dir_fd is not None:
+                file_stat = os.stat(os.path.basename(file_path), dir_fd=dir_fd)
+            else:
+                file_stat = os.stat(normalized_path)
+        except (FileNotFoundError, NotADirectoryError):
             result['error'] = f"File not found: {normalized_path}"
             result['file_info']['error_type'] = 'FileNotFound'
             return result
         
         # Check if it's a file
-        if not os.path.isfile(normalized_path):
+        if not stat.S_ISREG(file_stat.st_mode):
             result['error'] = f"Path is not a file: {normalized_path}"
             result['file_info']['error_type'] = 'NotAFile'
             return result
         
-        # Get file info
-        file_stat = os.stat(normalized_path)
         file_size = file_stat.st_size
         
         result['file_info'] = {
@@ -227,8 +590,11 @@ def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Confi
             result['file_info']['error_type'] = 'FileTooLarge'
             return result
         
-        # Enhanced binary detection
-        detection_result = enhanced_binary_detection(normalized_path)
+        # Enhanced binary detection and encoding detection (cached per file version)
+        detection_result, encoding, confidence = _cached_detection(
+            normalized_path, file_stat, dir_fd,
+            os.path.basename(file_path) if dir_fd is not None else None
+        )
         result['file_info']['detection'] = detection_result
         
         if detection_result['is_binary']:
@@ -236,8 +602,6 @@ def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Confi
             result['file_info']['error_type'] = 'BinaryFile'
             return result
         
-        # Detect encoding
-        encoding, confidence = detect_file_encoding(normalized_path)
         result['encoding_info'] = {
             'detected_encoding': encoding,
             'confidence': confidence
@@ -248,14 +612,16 @@ def safe_file_read(file_path: str, max_size: Optional[int] = None, config: Confi
             result['warnings'].append(f"Low confidence encoding detection: {encoding} ({confidence:.1%})")
         
         # Read file content
-        with open(normalized_path, 'r', encoding=encoding, errors='replace') as f:
-            content = f.read()
+        if dir_fd is not None:
+            content, replaced = _read_text(file_path, encoding, dir_fd)
+        else:
+            content, replaced = _read_text(normalized_path, encoding)
         
         result['success'] = True
         result['content'] = content
         
         # Add warnings for replaced characters
-        if '�' in content:
+        if replaced:
             result['warnings'].append("Some characters were replaced due to encoding issues")
         
         return result
@@ -294,40 +660,49 @@ def find_best_matching_file(root_dir: Path, user_path: str, config: Config, min_
         min_score = config.min_fuzzy_score
     
     try:
-        from thefuzz import fuzz, process as fuzzy_process
+        from rapidfuzz import fuzz, process as fuzzy_process, utils as fuzzy_utils
         
         # Collect all files
-        all_files = []
-        for root, dirs, files in os.walk(root_dir):
-            # Filter out excluded directories
-            dirs[:] = [d for d in dirs if d not in config.excluded_files]
-            
-            for file in files:
-                file_path = Path(root) / file
-                
-                # Skip excluded files
-                if file in config.excluded_files:
-                    continue
-                
-                # Skip excluded extensions
-                if file_path.suffix.lower() in config.excluded_extensions:
-                    continue
-                
-                # Store relative path
-                try:
-                    relative_path = file_path.relative_to(root_dir)
-                    all_files.append(str(relative_path))
-                except ValueError:
-                    continue
+        excluded_files, excluded_extensions = exclusion_sets(config)
+        root_prefix = os.path.join(os.fspath(root_dir), '')
+        all_files = [
+            entry.path[len(root_prefix):]
+            for entry in _walk_scandir(root_dir, excluded_files, excluded_extensions)
+        ]
         
         if not all_files:
             return None
         
-        # Find best match
-        best_match, score = fuzzy_process.extractOne(user_path, all_files, scorer=fuzz.ratio)
+        def best_match(candidates: List[str]) -> Optional[str]:
+            # Scores are rounded to whole numbers before the threshold check,
+            # as they were with thefuzz
+            match = fuzzy_process.extractOne(
+                user_path, candidates, scorer=fuzz.ratio,
+                processor=fuzzy_utils.default_process, score_cutoff=max(min_score - 0.5, 0)
+            )
+            if match is not None and round(match[1]) >= min_score:
+                return match[0]
+            return None
         
-        if score >= min_score:
-            return str(root_dir / best_match)
+        # On large trees, prefilter by basename so the full-path scorer only
+        # runs on the most promising candidates
+        match = None
+        if len(all_files) > _FUZZY_PREFILTER_LIMIT:
+            basenames = [os.path.basename(relative_path) for relative_path in all_files]
+            survivors = fuzzy_process.extract(
+                os.path.basename(user_path), basenames, scorer=fuzz.QRatio,
+                processor=fuzzy_utils.default_process,
+                score_cutoff=_FUZZY_PREFILTER_SCORE, limit=_FUZZY_PREFILTER_LIMIT
+            )
+            match = best_match([all_files[index] for _, _, index in survivors])
+        
+        # A match driven by the directory part of the path can have a poorly
+        # matching basename, so fall back to scoring every full path
+        if match is None:
+            match = best_match(all_files)
+        
+        if match is not None:
+            return str(root_dir / match)
         
         return None
         
@@ -337,6 +712,42 @@ def find_best_matching_file(root_dir: Path, user_path: str, config: Config, min_
         return None
 
 
+def _atomic_write_text(path: str, parts: Iterable[str]) -> None:
+    """
+    Write text to a file atomically via a temporary file and os.replace.
+    
+    The file either keeps its old content or gets the complete new content,
+    even if the process is interrupted. The original permission bits are kept,
+    and so are the owner and group where the process may set them (e.g. when
+    running as root); otherwise the file ends up owned by the current user.
+    ACLs and extended attributes are not carried over to the new file.
+    
+    Args:
+        path: Path of the file to replace
+        parts: String pieces written in order to form the new content
+    """
+    directory, name = os.path.split(path)
+    original_stat = os.stat(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            for part in parts:
+                f.write(part)
+        shutil.copymode(path, tmp_path)
+        if hasattr(os, 'chown'):
+            try:
+                os.chown(tmp_path, original_stat.st_uid, original_stat.st_gid)
+            except PermissionError:
+                pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
 def apply_fuzzy_diff_edit(path: str, original_snippet: str, new_snippet: str, config: Config) -> None:
     """
     Apply fuzzy diff edit to a file.
@@ -360,11 +771,15 @@ def apply_fuzzy_diff_edit(path: str, original_snippet: str, new_snippet: str, co
         content = f.read()
     
     # 1. Try exact match first
-    if original_snippet in content:
-        new_content = content.replace(original_snippet, new_snippet)
+    match_start = content.find(original_snippet)
+    if match_start != -1:
+        match_end = match_start + len(original_snippet)
         
-        with open(normalized_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        if content.find(original_snippet, match_end) == -1:
+            # Single occurrence: write the surrounding slices directly
+            _atomic_write_text(normalized_path, (content[:match_start], new_snippet, content[match_end:]))
+        else:
+            _atomic_write_text(normalized_path, (content.replace(original_snippet, new_snippet),))
         
         console.print(f"[bold blue]✓[/bold blue] Applied exact edit to '[bright_cyan]{normalized_path}[/bright_cyan]'")
         return
@@ -373,53 +788,46 @@ def apply_fuzzy_diff_edit(path: str, original_snippet: str, new_snippet: str, co
     if not config.fuzzy_available or not config.fuzzy_enabled_by_default:
         raise ValueError("Original snippet not found and fuzzy matching not available or disabled")
     
-    from thefuzz import fuzz, process as fuzzy_process
+    from rapidfuzz import fuzz, process as fuzzy_process
     
     console.print("[dim]Exact snippet not found. Trying fuzzy matching...[/dim]")
     
-    # Split content into lines for fuzzy matching
-    lines = content.split('\n')
-    snippet_lines = original_snippet.split('\n')
+    # Offsets of each line start; a window of lines is then a plain slice of content
+    offsets = [0]
+    offsets.extend(match.end() for match in re.finditer('\n', content))
+    offsets.append(len(content) + 1)
+    line_count = len(offsets) - 1
     
     # Create sliding window of lines to match against
-    window_size = len(snippet_lines)
-    if window_size > len(lines):
+    window_size = original_snippet.count('\n') + 1
+    if window_size > line_count:
         raise ValueError("Original snippet is longer than the file content.")
     
-    # Find best matching window
-    best_match = None
-    best_score = 0
-    best_start = 0
+    windows = [content[offsets[i]:offsets[i + window_size] - 1] for i in range(line_count - window_size + 1)]
     
-    for i in range(len(lines) - window_size + 1):
-        window = '\n'.join(lines[i:i + window_size])
-        score = fuzz.ratio(original_snippet, window)
-        
-        if score > best_score:
-            best_score = score
-            best_match = window
-            best_start = i
+    # Score every window in a single pass; the top two decide both the
+    # threshold check and the ambiguity check. Scores are rounded to whole
+    # numbers so min_edit_score keeps its integer meaning
+    top_matches = [
+        (window, round(score), index)
+        for window, score, index in fuzzy_process.extract(original_snippet, windows, scorer=fuzz.ratio, limit=2)
+    ]
     
     # Check if match is good enough
-    if best_score < config.min_edit_score:
+    if not top_matches or top_matches[0][1] < config.min_edit_score:
+        best_score = top_matches[0][1] if top_matches else 0
         raise ValueError(f"No good fuzzy match found. Best score: {best_score}")
     
     # Check for ambiguous matches
-    matches_above_threshold = 0
-    for i in range(len(lines) - window_size + 1):
-        window = '\n'.join(lines[i:i + window_size])
-        if fuzz.ratio(original_snippet, window) >= config.min_edit_score:
-            matches_above_threshold += 1
-    
-    if matches_above_threshold > 1:
+    if len(top_matches) > 1 and top_matches[1][1] >= config.min_edit_score:
         raise ValueError(f"Ambiguous fuzzy edit: The best matching snippet appears multiple times in the file.")
     
-    # Replace the best fuzzy match
-    new_lines = lines[:best_start] + new_snippet.split('\n') + lines[best_start + window_size:]
-    new_content = '\n'.join(new_lines)
+    _, best_score, best_start = top_matches[0]
     
-    with open(normalized_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    # Replace the best fuzzy match
+    match_start = offsets[best_start]
+    match_end = offsets[best_start + window_size] - 1
+    _atomic_write_text(normalized_path, (content[:match_start], new_snippet, content[match_end:]))
     
     console.print(f"[bold blue]✓[/bold blue] Applied [bold]fuzzy[/bold] diff edit to '[bright_cyan]{normalized_path}[/bright_cyan]' (score: {best_score})")
 
@@ -459,40 +867,40 @@ def add_file_context_smartly(file_path: str, session, config: Config) -> None:
         files_added = 0
         total_size = 0
         
+        # Hoist config lookups out of the per-file loop
+        excluded_files, excluded_extensions = exclusion_sets(config)
+        base_dir = config.base_dir
+        max_total_size = config.max_multiple_read_size
+        max_files = config.max_files_in_add_dir
+        add_message = session.add_message
+        
         # Walk through directory
-        for root, dirs, files in os.walk(path_obj):
-            # Filter out excluded directories
-            dirs[:] = [d for d in dirs if d not in config.excluded_files]
-            
-            for file in files:
-                file_path_obj = Path(root) / file
-                
-                # Skip excluded files
-                if file in config.excluded_files:
-                    continue
-                
-                # Skip excluded extensions
-                if file_path_obj.suffix.lower() in config.excluded_extensions:
-                    continue
-                
-                # Check size limits
-                if total_size > config.max_multiple_read_size:
-                    break
-                
-                if files_added >= config.max_files_in_add_dir:
-                    break
-                
-                # Read file
-                read_result = safe_file_read(str(file_path_obj), config=config)
-                
-                if read_result['success']:
-                    relative_path = file_path_obj.relative_to(config.base_dir)
-                    session.add_message("system", f"User added file '{relative_path}':\n\n{read_result['content']}")
-                    files_added += 1
-                    total_size += len(read_result['content'])
+        for dir_fd, entry in _scandir_walk_with_fd(path_obj, excluded_files, excluded_extensions):
+            # Check size limits
+            remaining_size = max_total_size - total_size
+            if remaining_size <= 0:
+                break
             
-            if files_added >= config.max_files_in_add_dir or total_size > config.max_multiple_read_size:
+            if files_added >= max_files:
                 break
+            
+            # Skip files that would exceed the size budget before reading them
+            try:
+                file_size = entry.stat().st_size
+            except OSError:
+                continue
+            
+            if file_size > remaining_size:
+                continue
+            
+            # Read file
+            read_result = safe_file_read(entry.path, max_size=remaining_size, config=config, dir_fd=dir_fd)
+            
+            if read_result['success']:
+                relative_path = os.path.relpath(entry.path, base_dir)
+                add_message("system", f"User added file '{relative_path}':\n\n{read_result['content']}")
+                files_added += 1
+                total_size += file_size
         
         relative_dir = path_obj.relative_to(config.base_dir)
         console.print(f"[bold green]✓[/bold green] Added {files_added} files from directory '[bright_cyan]{relative_dir}[/bright_cyan]' to context")
@@ -7,12 +7,73 @@ Handles path normalization, validation, and directory operations.
 """
 
 import os
+import heapq
+import functools
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Callable, Iterable, List, Optional, Union, Tuple, FrozenSet
 
 from ..core.config import Config
 
 
+def file_extension(name: str) -> str:
+    """
+    Get the lowercased extension of a file name.
+    
+    Mirrors ``Path(name).suffix.lower()`` without constructing a Path object.
+    
+    Args:
+        name: File name (not a full path)
+        
+    Returns:
+        Lowercased extension including the dot, or '' if there is none
+    """
+    dot = name.rfind('.')
+    if dot <= 0 or dot == len(name) - 1:
+        return ''
+    return name[dot:].lower()
+
+
+def _as_frozenset(values) -> FrozenSet[str]:
+    """Return values as a frozenset, without copying one that already is."""
+    return values if isinstance(values, frozenset) else frozenset(values)
+
+
+def exclusion_sets(config: Config) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Snapshot the configured exclusions as frozensets for hot-loop membership checks.
+    
+    Config already stores frozensets, in which case no copy is made; this
+    guards against callers that assign plain lists or sets.
+    
+    Args:
+        config: Configuration object
+        
+    Returns:
+        Tuple of (excluded_files, lowercased excluded_extensions)
+    """
+    excluded_files = _as_frozenset(config.excluded_files)
+    excluded_extensions = _lowercased_extensions(_as_frozenset(config.excluded_extensions))
+    return excluded_files, excluded_extensions
+
+
+@functools.lru_cache(maxsize=16)
+def _lowercased_extensions(excluded_extensions: FrozenSet[str]) -> FrozenSet[str]:
+    """
+    Lowercase an extension set once per distinct set.
+    
+    Returns the same object when it is already lowercase, as Config's own
+    sets are, so later cache keys built from it stay cheap to hash.
+    
+    Args:
+        excluded_extensions: Configured extensions
+        
+    Returns:
+        Extensions as a lowercase frozenset
+    """
+    lowered = frozenset(ext.lower() for ext in excluded_extensions)
+    return excluded_extensions if lowered == excluded_extensions else lowered
+
+
 def normalize_path(path_str: str, config: Config, allow_outside_project: bool = False) -> str:
     """
     Normalize and validate a file path relative to the base directory.
@@ -36,29 +97,139 @@ def normalize_path(path_str: str, config: Config, allow_outside_project: bool =
     if not path_str or not path_str.strip():
         raise ValueError("Path cannot be empty")
     
-    path_str = path_str.strip()
+    return _normalize_path(path_str.strip(), str(config.base_dir), allow_outside_project)
+
+
+@functools.lru_cache(maxsize=256)
+def _resolved_base(base_dir_str: str) -> str:
+    """
+    Resolve a base directory once per distinct value.
     
-    # Convert to Path object
-    if os.path.isabs(path_str):
-        # Absolute path
-        normalized_path = Path(path_str).resolve()
-    else:
-        # Relative path - make it relative to base_dir
-        normalized_path = (config.base_dir / path_str).resolve()
+    Args:
+        base_dir_str: Base directory as a string
+        
+    Returns:
+        Canonical base directory with symlinks resolved
+    """
+    return os.path.realpath(base_dir_str)
+
+
+def _is_within(path: str, base_dir: str) -> bool:
+    """
+    Check whether a resolved path is base_dir itself or lies below it.
+    
+    Args:
+        path: Canonical absolute path
+        base_dir: Canonical absolute base directory
+        
+    Returns:
+        True if path is inside base_dir, False otherwise
+    """
+    try:
+        return os.path.commonpath((path, base_dir)) == base_dir
+    except ValueError:
+        # Paths on different drives have no common path
+        return False
+
+
+def is_within_base(path: Union[str, Path], config: Config) -> bool:
+    """
+    Check whether a path, with symlinks resolved, is the base directory or lies below it.
+    
+    Args:
+        path: Path to check
+        config: Configuration object
+        
+    Returns:
+        True if the resolved path is inside the base directory, False otherwise
+    """
+    return _is_within(os.path.realpath(path), _resolved_base(str(config.base_dir)))
+
+
+def _outside_base_error(path_str: str, resolved: str, base_dir: str) -> ValueError:
+    """Build the error raised when a path escapes the base directory."""
+    return ValueError(
+        f"Security: Path '{path_str}' resolves to '{resolved}' "
+        f"which is outside the base directory '{base_dir}'. "
+        f"This is not allowed for security reasons."
+    )
+
+
+@functools.lru_cache(maxsize=8192)
+def _lexical_candidate(path_str: str, base_dir_str: str, allow_outside_project: bool) -> Tuple[str, str]:
+    """
+    Join a path onto the canonical base and apply the text-only checks; memoized.
+    
+    Only string work is cached here. Symlinks can change at any time, so
+    callers must resolve the candidate and check containment on every call.
+    
+    Args:
+        path_str: The path string to normalize
+        base_dir_str: Base directory as a string
+        allow_outside_project: Whether to allow paths outside the project
+        
+    Returns:
+        Tuple of (canonical base directory, joined candidate path)
+        
+    Raises:
+        ValueError: If the path visibly escapes the base directory and that is not allowed
+    """
+    # Compare against the canonical base, since normalized paths are resolved too
+    base_dir = _resolved_base(base_dir_str)
+    
+    # join() discards base_dir when path_str is absolute
+    candidate = os.path.join(base_dir, path_str)
     
-    # Security check: ensure path is within base directory
     if not allow_outside_project:
-        try:
-            # This will raise ValueError if path is outside base_dir
-            normalized_path.relative_to(config.base_dir)
-        except ValueError:
-            raise ValueError(
-                f"Security: Path '{path_str}' resolves to '{normalized_path}' "
-                f"which is outside the base directory '{config.base_dir}'. "
-                f"This is not allowed for security reasons."
-            )
+        # Reject escapes visible in the text alone before any syscall. Collapsing
+        # '..' lexically can only be stricter than resolving it after a symlink,
+        # and the realpath check in _normalize_path still runs for paths that pass
+        lexical_path = os.path.normpath(candidate)
+        if not _is_within(lexical_path, base_dir):
+            raise _outside_base_error(path_str, lexical_path, base_dir)
+    
+    return base_dir, candidate
+
+
+def _normalize_path(path_str: str, base_dir_str: str, allow_outside_project: bool) -> str:
+    """
+    Resolve and validate a stripped, non-empty path.
+    
+    The symlink resolution and containment check are never cached, so a
+    path swapped for a symlink after an earlier call is still rejected.
+    
+    Args:
+        path_str: The path string to normalize
+        base_dir_str: Base directory as a string
+        allow_outside_project: Whether to allow paths outside the project
+        
+    Returns:
+        Normalized absolute path as string
+        
+    Raises:
+        ValueError: If path is outside base directory and not allowed
+    """
+    base_dir, candidate = _lexical_candidate(path_str, base_dir_str, allow_outside_project)
     
-    return str(normalized_path)
+    # One realpath call resolves symlinks and '..' for the whole path
+    normalized_path = os.path.realpath(candidate)
+    
+    # Security check: ensure path is within base directory
+    if not allow_outside_project and not _is_within(normalized_path, base_dir):
+        raise _outside_base_error(path_str, normalized_path, base_dir)
+    
+    return normalized_path
+
+
+def clear_path_cache() -> None:
+    """Clear memoized path joins and base directories (e.g. after changing base_dir)."""
+    _lexical_candidate.cache_clear()
+    _resolved_base.cache_clear()
+
+
+# One directory child as listed for the tree summary: (name, is_dir, handle),
+# where handle is whatever the lister needs to list that child in turn
+_TreeChild = Tuple[str, bool, Any]
 
 
 def get_directory_tree_summary(root_dir: Path, config: Config, max_depth: int = 3, max_entries: int = 100) -> str:
@@ -74,35 +245,121 @@ def get_directory_tree_summary(root_dir: Path, config: Config, max_depth: int =
     Returns:
         Formatted directory tree summary
     """
-    if not root_dir.exists() or not root_dir.is_dir():
+    # is_dir() is False for missing paths too, so one stat covers both checks
+    if not root_dir.is_dir():
         return f"Directory '{root_dir}' does not exist or is not a directory."
     
+    return _format_tree(root_dir.name, os.fspath(root_dir), _list_tree, config, max_depth, max_entries)
+
+
+def get_directory_tree_summary_from_entries(
+    root_name: str,
+    entries: Iterable[tuple],
+    config: Config,
+    max_depth: int = 3,
+    max_entries: int = 100
+) -> str:
+    """
+    Generate a directory summary from pre-listed entries instead of the filesystem.
+    
+    Produces exactly what get_directory_tree_summary would for a directory
+    with the same contents, applying the same exclusions and limits.
+    
+    Args:
+        root_name: Name shown for the root directory
+        entries: (name, is_dir) or (name, is_dir, children) tuples, where
+            children are the entries of a directory in the same form
+        config: Configuration object
+        max_depth: Maximum depth to traverse
+        max_entries: Maximum number of entries to include
+        
+    Returns:
+        Formatted directory tree summary
+    """
+    return _format_tree(root_name, entries, _list_entries, config, max_depth, max_entries)
+
+
+def _list_tree(path: str) -> List[_TreeChild]:
+    """
+    List one filesystem directory for the tree summary.
+    
+    Symlinks are not followed, so d_type answers is_dir() without a stat.
+    
+    Args:
+        path: Directory to list
+        
+    Returns:
+        (name, is_dir, path) for each entry
+    """
+    with os.scandir(path) as it:
+        return [(item.name, item.is_dir(follow_symlinks=False), item.path) for item in it]
+
+
+def _list_entries(entries: Iterable[tuple]) -> List[_TreeChild]:
+    """
+    List one directory of pre-built entries for the tree summary.
+    
+    Args:
+        entries: (name, is_dir) or (name, is_dir, children) tuples
+        
+    Returns:
+        (name, is_dir, children) for each entry
+    """
+    return [(name, is_dir, rest[0] if rest else ()) for name, is_dir, *rest in entries]
+
+
+def _format_tree(
+    root_name: str,
+    root: Any,
+    list_children: Callable[[Any], List[_TreeChild]],
+    config: Config,
+    max_depth: int,
+    max_entries: int
+) -> str:
+    """
+    Format a directory tree, listing each directory only when it is reached.
+    
+    Args:
+        root_name: Name shown for the root directory
+        root: Handle of the root directory passed to list_children
+        list_children: Lists one directory as (name, is_dir, handle) tuples
+        config: Configuration object
+        max_depth: Maximum depth to traverse
+        max_entries: Maximum number of entries to include
+        
+    Returns:
+        Formatted directory tree summary
+    """
     entries = []
     entry_count = 0
+    excluded_files, excluded_extensions = exclusion_sets(config)
     
-    def scan_directory(path: Path, depth: int = 0, prefix: str = "") -> None:
+    def scan_directory(handle: Any, depth: int = 0, prefix: str = "") -> None:
         nonlocal entry_count
         
         if depth > max_depth or entry_count >= max_entries:
             return
         
         try:
-            # Get directory contents, sorted
-            items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name.lower()))
+            # Get non-excluded directory contents.
+            # Excluded directories are dropped here, so they are never opened
+            candidates = [
+                child for child in list_children(handle)
+                if child[0] not in excluded_files
+                and file_extension(child[0]) not in excluded_extensions
+            ]
+            
+            # Only the first `remaining` entries can be shown, so select them
+            # with a bounded heap instead of sorting the whole directory
+            remaining = max_entries - entry_count
+            items = heapq.nsmallest(remaining, candidates, key=lambda x: (not x[1], x[0].lower()))
             
-            for i, item in enumerate(items):
+            for i, (name, is_dir, child_handle) in enumerate(items):
                 if entry_count >= max_entries:
                     break
                 
-                # Skip excluded files and directories
-                if item.name in config.excluded_files:
-                    continue
-                
-                if item.suffix.lower() in config.excluded_extensions:
-                    continue
-                
                 # Determine if this is the last item
-                is_last = i == len(items) - 1
+                is_last = i == len(candidates) - 1
                 
                 # Create tree structure
                 if depth == 0:
@@ -112,16 +369,16 @@ def get_directory_tree_summary(root_dir: Path, config: Config, max_depth: int =
                     current_prefix = prefix + ("└── " if is_last else "├── ")
                     next_prefix = prefix + ("    " if is_last else "│   ")
                 
-                if item.is_dir():
-                    entries.append(f"{current_prefix}📁 {item.name}/")
+                if is_dir:
+                    entries.append(f"{current_prefix}📁 {name}/")
                     entry_count += 1
                     
                     # Recursively scan subdirectory
                     if depth < max_depth:
-                        scan_directory(item, depth + 1, next_prefix)
+                        scan_directory(child_handle, depth + 1, next_prefix)
                 else:
                     # File
-                    entries.append(f"{current_prefix}📄 {item.name}")
+                    entries.append(f"{current_prefix}📄 {name}")
                     entry_count += 1
         
         except PermissionError:
@@ -132,9 +389,9 @@ def get_directory_tree_summary(root_dir: Path, config: Config, max_depth: int =
             entry_count += 1
     
     # Start scanning
-    entries.append(f"📁 {root_dir.name}/")
+    entries.append(f"📁 {root_name}/")
     entry_count += 1
-    scan_directory(root_dir)
+    scan_directory(root)
     
     # Add truncation notice if needed
     if entry_count >= max_entries:
@@ -171,14 +428,15 @@ def get_relative_path(path: Union[str, Path], base_dir: Path) -> str:
         base_dir: Base directory
         
     Returns:
-        Relative path string
+        Relative path string, or the absolute (not symlink-resolved) path
+        if it is outside base_dir
     """
     try:
         path_obj = Path(path).resolve()
         return str(path_obj.relative_to(base_dir))
     except ValueError:
-        # Path is outside base_dir, return absolute path
-        return str(Path(path).resolve())
+        # Path is outside base_dir; absolute form only, no second resolve
+        return os.path.abspath(path)
 
 
 def ensure_directory_exists(path: Union[str, Path]) -> None:
@@ -202,14 +460,27 @@ def is_excluded_file(file_path: Union[str, Path], config: Config) -> bool:
     Returns:
         True if file should be excluded, False otherwise
     """
-    path = Path(file_path)
-    
-    # Check excluded files
-    if path.name in config.excluded_files:
-        return True
+    return _is_excluded_cached(
+        Path(file_path).name,
+        *exclusion_sets(config),
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_excluded_cached(name: str, excluded_files: FrozenSet[str], excluded_extensions: FrozenSet[str]) -> bool:
+    """
+    Check a file name against exclusion sets; memoized on all three arguments.
     
-    # Check excluded extensions
-    if path.suffix.lower() in config.excluded_extensions:
-        return True
+    The sets are part of the key, so changing a config's exclusions never
+    returns a stale answer. Frozensets cache their hash, so the key is cheap
+    for Config's own exclusions.
     
-    return False
\ No newline at end of file
+    Args:
+        name: File name (not a full path)
+        excluded_files: Excluded file and directory names
+        excluded_extensions: Lowercase excluded extensions, compared against the lowercased suffix
+        
+    Returns:
+        True if the name is excluded, False otherwise
+    """
+    return name in excluded_files or file_extension(name) in excluded_extensions
\ No newline at end of file
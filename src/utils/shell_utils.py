@@ -7,12 +7,50 @@ Handles shell command execution with security controls.
 """
 
 import os
+import re
+import stat
+import time
+import uuid
+import shlex
+import atexit
+import signal
+import locale
+import selectors
 import subprocess
 import shutil
+import threading
+import tempfile
+import functools
 from pathlib import Path
-from typing import Optional, Union, Tuple
+from typing import Optional, Union, Tuple, Dict, List
 
 from ..core.config import Config
+from .path_utils import is_within_base
+
+
+@functools.lru_cache(maxsize=None)
+def _which_cached(name: str, path: str) -> Optional[str]:
+    """
+    Locate an executable, memoized per PATH value.
+    
+    Args:
+        name: Executable name
+        path: PATH string to search
+        
+    Returns:
+        Full path to the executable, or None if not found
+    """
+    return shutil.which(name, path=path)
+
+
+def _which(name: str) -> Optional[str]:
+    """Locate an executable on the current PATH using the lookup cache."""
+    return _which_cached(name, os.environ.get("PATH", ""))
+
+
+def clear_which_cache() -> None:
+    """Forget cached executable lookups, e.g. after installing a shell."""
+    _which_cached.cache_clear()
 
 
 def detect_available_shells(config: Config) -> None:
@@ -29,13 +67,316 @@ def detect_available_shells(config: Config) -> None:
             # cmd is always available on Windows
             config.os_info['shell_available'][shell] = True
         elif shell == 'powershell':
-            # Check for both Windows PowerShell and PowerShell Core
-            config.os_info['shell_available'][shell] = (
-                shutil.which('powershell') is not None or 
-                shutil.which('pwsh') is not None
-            )
+            # Prefer PowerShell Core (pwsh), then Windows PowerShell
+            config.os_info['powershell_path'] = _which('pwsh') or _which('powershell')
+            config.os_info['shell_available'][shell] = config.os_info['powershell_path'] is not None
+        elif shell == 'bash':
+            config.os_info['bash_path'] = _which('bash')
+            config.os_info['shell_available'][shell] = config.os_info['bash_path'] is not None
         else:
-            config.os_info['shell_available'][shell] = shutil.which(shell) is not None
+            config.os_info['shell_available'][shell] = _which(shell) is not None
+    
+    # Availability changed, so the preferred shell must be recomputed
+    config._cached_shell = None
+
+
+# Most output kept per stream from a shell command; the rest is discarded
+_MAX_OUTPUT_BYTES = 1024 * 1024
+
+
+class _ShellPool:
+    """
+    A long-lived bash process that runs commands without a fork+exec per call.
+    
+    Each command runs in a subshell with stdin redirected from /dev/null, so
+    ``cd``, ``exit``, variable assignments and reads from stdin cannot
+    disturb the pooled shell; a command that reads stdin sees end-of-file
+    rather than the terminal. The subshell's stdout and stderr go to a pair
+    of named pipes created for that command alone, and its output is read
+    until every writer has closed them, as subprocess does with its pipes.
+    Output from background jobs therefore stays with the command that
+    started them. The shell reports the exit status on its own stdout after
+    a per-command marker.
+    
+    Differences from spawning bash per command: the environment is the one
+    the process had when the shell was first started, so later changes to
+    os.environ are not seen until the shell is restarted, and because all
+    commands are read from one script, line numbers in bash error messages
+    keep growing from call to call.
+    """
+    
+    def __init__(self) -> None:
+        self._proc: Optional[subprocess.Popen] = None
+        self._executable: Optional[str] = None
+        self._fifo_dir: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def _ensure_started(self, executable: str) -> subprocess.Popen:
+        """Start the shell process if it is not running (or runs another executable)."""
+        if self._executable != executable:
+            self._kill()
+        if self._proc is None or self._proc.poll() is not None:
+            self._executable = executable
+            self._proc = subprocess.Popen(
+                [executable, '-s'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+        if self._fifo_dir is None:
+            self._fifo_dir = tempfile.mkdtemp(prefix='kimi-shell-')
+        return self._proc
+    
+    def _kill(self) -> None:
+        """Kill the shell process and anything it started."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        proc.wait()
+        for stream in (proc.stdin, proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+    
+    def close(self) -> None:
+        """Kill the shell process and anything it started, and remove its pipes."""
+        self._kill()
+        fifo_dir, self._fifo_dir = self._fifo_dir, None
+        if fifo_dir is not None:
+            shutil.rmtree(fifo_dir, ignore_errors=True)
+    
+    def run(self, command: str, cwd: str, timeout: float,
+            executable: str = 'bash') -> Tuple[str, str, int]:
+        """
+        Run a command in the pooled shell.
+        
+        Args:
+            command: Command to execute
+            cwd: Working directory for the command
+            timeout: Seconds to wait before killing the shell
+            executable: Path of the bash executable to pool
+            
+        Returns:
+            Tuple of (stdout, stderr, returncode)
+            
+        Raises:
+            subprocess.TimeoutExpired: If the command does not finish in time
+        """
+        with self._lock:
+            proc = self._ensure_started(executable)
+            
+            token = uuid.uuid4().hex
+            marker = f"__KIMI_END_{token}__"
+            fifo_paths = [os.path.join(self._fifo_dir, f"{token}.{name}") for name in ('out', 'err')]
+            read_fds: List[int] = []
+            hold_fds: List[int] = []
+            try:
+                for path in fifo_paths:
+                    os.mkfifo(path, 0o600)
+                    read_fds.append(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+                    # Hold a write end until the subshell has exited, so
+                    # end-of-file cannot be seen before the subshell opened it
+                    hold_fds.append(os.open(path, os.O_WRONLY | os.O_NONBLOCK))
+                
+                out_path, err_path = (shlex.quote(path) for path in fifo_paths)
+                script = (
+                    f"( cd -- {shlex.quote(cwd)} && eval {shlex.quote(command)} ) "
+                    f"</dev/null >{out_path} 2>{err_path}\n"
+                    f"printf '%s%s\\n' '{marker}' \"$?\"\n"
+                ).encode()
+                
+                try:
+                    proc.stdin.write(script)
+                    proc.stdin.flush()
+                except BrokenPipeError:
+                    # The shell died between commands; start a fresh one,
+                    # keeping this command's pipes
+                    self._kill()
+                    proc = self._ensure_started(executable)
+                    proc.stdin.write(script)
+                    proc.stdin.flush()
+                
+                try:
+                    out_bytes, err_bytes, rc_bytes = self._read_command_output(
+                        proc.stdout.fileno(), read_fds, hold_fds, marker.encode(), command, timeout
+                    )
+                except BaseException:
+                    self.close()
+                    raise
+            finally:
+                for fd in read_fds + hold_fds:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                for path in fifo_paths:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+        
+        return _decode_output(out_bytes), _decode_output(err_bytes), int(rc_bytes)
+    
+    @staticmethod
+    def _read_command_output(shell_fd: int, read_fds: List[int], hold_fds: List[int],
+                             marker: bytes, command: str, timeout: float) -> Tuple[bytes, bytes, bytes]:
+        """
+        Read a command's stdout and stderr pipes until end-of-file.
+        
+        The shell writes the marker followed by the exit status once the
+        subshell has exited; only then are the held write ends in hold_fds
+        closed, after which end-of-file means no process still writes.
+        
+        Args:
+            shell_fd: The pooled shell's stdout
+            read_fds: Read ends of the command's stdout and stderr pipes
+            hold_fds: Write ends held open until the marker arrives; closed
+                (and emptied) by this method
+            marker: End marker preceding the exit status
+            command: Command being run, for the timeout error
+            timeout: Seconds to wait in total
+            
+        Returns:
+            Tuple of (stdout, stderr, exit status digits)
+            
+        Raises:
+            subprocess.TimeoutExpired: If the output does not end in time
+        """
+        outputs = {fd: _CappedBuffer() for fd in read_fds}
+        shell_data = b''
+        status = None
+        deadline = time.monotonic() + timeout
+        
+        with selectors.DefaultSelector() as selector:
+            selector.register(shell_fd, selectors.EVENT_READ)
+            for fd in read_fds:
+                selector.register(fd, selectors.EVENT_READ)
+            
+            while status is None or selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(command, timeout)
+                
+                for key, _ in selector.select(remaining):
+                    try:
+                        chunk = os.read(key.fd, 65536)
+                    except BlockingIOError:
+                        continue
+                    
+                    if key.fd != shell_fd:
+                        if chunk:
+                            outputs[key.fd].write(chunk)
+                        else:
+                            selector.unregister(key.fd)
+                        continue
+                    
+                    if not chunk:
+                        raise RuntimeError("shell process exited unexpectedly")
+                    
+                    # The marker line may arrive split across reads
+                    shell_data += chunk
+                    index = shell_data.find(marker)
+                    line_end = shell_data.find(b"\n", index + len(marker)) if index >= 0 else -1
+                    if line_end < 0:
+                        continue
+                    
+                    status = shell_data[index + len(marker):line_end]
+                    selector.unregister(shell_fd)
+                    while hold_fds:
+                        os.close(hold_fds.pop())
+        
+        stdout_fd, stderr_fd = read_fds
+        return outputs[stdout_fd].getvalue(), outputs[stderr_fd].getvalue(), status
+
+
+class _CappedBuffer:
+    """Accumulates command output, keeping at most _MAX_OUTPUT_BYTES."""
+    
+    def __init__(self) -> None:
+        self._data = bytearray()
+        self._truncated = False
+    
+    def write(self, data: bytes) -> None:
+        """Append data, silently dropping whatever exceeds the cap."""
+        room = _MAX_OUTPUT_BYTES - len(self._data)
+        if len(data) > room:
+            self._truncated = True
+            data = data[:max(room, 0)]
+        self._data += data
+    
+    def getvalue(self) -> bytes:
+        """Return the kept output, with a note if anything was dropped."""
+        if self._truncated:
+            return bytes(self._data) + b"\n... [output truncated at 1 MiB]"
+        return bytes(self._data)
+
+
+def _run_streaming(args: list, cwd: str, timeout: float) -> Tuple[str, str, int]:
+    """
+    Run a command, draining its output as it is produced with a size cap.
+    
+    Reader threads are used rather than selectors so that this also works
+    with Windows pipes.
+    
+    Args:
+        args: Program and arguments to execute
+        cwd: Working directory
+        timeout: Seconds to wait before killing the process
+        
+    Returns:
+        Tuple of (stdout, stderr, returncode)
+        
+    Raises:
+        subprocess.TimeoutExpired: If the command does not finish in time
+    """
+    proc = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    outputs = (_CappedBuffer(), _CappedBuffer())
+    
+    def drain(stream, output: _CappedBuffer) -> None:
+        with stream:
+            for chunk in iter(lambda: stream.read1(65536), b''):
+                output.write(chunk)
+    
+    readers = [
+        threading.Thread(target=drain, args=(stream, output), daemon=True)
+        for stream, output in zip((proc.stdout, proc.stderr), outputs)
+    ]
+    for reader in readers:
+        reader.start()
+    
+    deadline = time.monotonic() + timeout
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        # Background children may hold the pipes open; never wait past the deadline
+        for reader in readers:
+            reader.join(max(deadline - time.monotonic(), 0))
+    
+    stdout, stderr = (_decode_output(output.getvalue()) for output in outputs)
+    return stdout, stderr, returncode
+
+
+def _decode_output(data: bytes) -> str:
+    """Decode captured output the way subprocess text mode does."""
+    text = data.decode(locale.getpreferredencoding(False), errors='replace')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+# Pooled bash process, used where pipes can be polled (POSIX)
+_BASH_POOL = _ShellPool() if os.name == 'posix' else None
+if _BASH_POOL is not None:
+    atexit.register(_BASH_POOL.close)
 
 
 def run_bash_command(command: str, config: Config, 
@@ -63,27 +404,31 @@ def run_bash_command(command: str, config: Config,
     if cwd is None:
         cwd = config.base_dir
     
+    # Resolved once during shell detection, so no PATH walk per command
+    bash_exe = config.os_info.get('bash_path')
+    if bash_exe is None:
+        return "Error: bash not found. Please ensure bash is installed and in your PATH."
+    
     try:
-        # Use bash explicitly to ensure consistent behavior
-        result = subprocess.run(
-            ['bash', '-c', command],
-            cwd=str(cwd),
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
+        if _BASH_POOL is not None:
+            # Reuse the pooled shell instead of spawning bash per command
+            stdout, stderr, returncode = _BASH_POOL.run(command, str(cwd), timeout=30,
+                                                        executable=bash_exe)
+        else:
+            # Use bash explicitly to ensure consistent behavior
+            stdout, stderr, returncode = _run_streaming([bash_exe, '-c', command], str(cwd), timeout=30)
         
         # Format output
         output_parts = []
         
-        if result.stdout:
-            output_parts.append(f"stdout:\n{result.stdout}")
+        if stdout:
+            output_parts.append(f"stdout:\n{stdout}")
         
-        if result.stderr:
-            output_parts.append(f"stderr:\n{result.stderr}")
+        if stderr:
+            output_parts.append(f"stderr:\n{stderr}")
         
-        if result.returncode != 0:
-            output_parts.append(f"Exit code: {result.returncode}")
+        if returncode != 0:
+            output_parts.append(f"Exit code: {returncode}")
         
         return "\n".join(output_parts) if output_parts else "Command completed with no output."
         
@@ -120,30 +465,27 @@ def run_powershell_command(command: str, config: Config,
     if cwd is None:
         cwd = config.base_dir
     
+    # Resolved once during shell detection (pwsh preferred), so no PATH walk per command
+    powershell_exe = config.os_info.get('powershell_path')
+    if powershell_exe is None:
+        return "Error: PowerShell not found. Please ensure PowerShell is installed and in your PATH."
+    
     try:
-        # Try PowerShell Core first (pwsh), then Windows PowerShell
-        powershell_exe = 'pwsh' if shutil.which('pwsh') else 'powershell'
-        
         # Use -Command parameter for better compatibility
-        result = subprocess.run(
-            [powershell_exe, '-Command', command],
-            cwd=str(cwd),
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 second timeout
-        )
+        stdout, stderr, returncode = _run_streaming([powershell_exe, '-Command', command],
+                                                    str(cwd), timeout=30)
         
         # Format output
         output_parts = []
         
-        if result.stdout:
-            output_parts.append(f"stdout:\n{result.stdout}")
+        if stdout:
+            output_parts.append(f"stdout:\n{stdout}")
         
-        if result.stderr:
-            output_parts.append(f"stderr:\n{result.stderr}")
+        if stderr:
+            output_parts.append(f"stderr:\n{stderr}")
         
-        if result.returncode != 0:
-            output_parts.append(f"Exit code: {result.returncode}")
+        if returncode != 0:
+            output_parts.append(f"Exit code: {returncode}")
         
         return "\n".join(output_parts) if output_parts else "Command completed with no output."
         
@@ -165,18 +507,78 @@ def get_shell_for_os(config: Config) -> str:
     Returns:
         Shell name
     """
+    if config._cached_shell is not None:
+        return config._cached_shell
+    
+    shell_available = config.os_info['shell_available']
     if config.os_info['is_windows']:
-        if config.os_info['shell_available']['powershell']:
-            return 'powershell'
-        elif config.os_info['shell_available']['cmd']:
-            return 'cmd'
+        candidates = ('powershell', 'cmd')
     else:
-        if config.os_info['shell_available']['bash']:
-            return 'bash'
-        elif config.os_info['shell_available']['zsh']:
-            return 'zsh'
+        candidates = ('bash', 'zsh')
     
-    return 'unknown'
+    config._cached_shell = next((shell for shell in candidates if shell_available[shell]), 'unknown')
+    return config._cached_shell
+
+
+# Substrings that mark a command as potentially dangerous (matched case-insensitively)
+_DANGEROUS_PATTERNS = (
+    'rm -rf /',
+    'del /f /s /q',
+    'format',
+    'fdisk',
+    'dd if=',
+    'shutdown',
+    'reboot',
+    'halt',
+    'poweroff',
+    'mkfs',
+    'wipefs',
+    'shred',
+    'chown -R',
+    'chmod -R 777',
+    'sudo su',
+    'su root',
+    '> /dev/null',
+    'curl | bash',
+    'wget | bash',
+    'eval $(',
+    'exec(',
+    '$(curl',
+    '$(wget',
+)
+
+def _trie_pattern(patterns) -> str:
+    """
+    Build a regex alternation of literal patterns factored by common prefixes.
+    
+    At each position the regex engine then tries one branch per distinct
+    next character instead of every pattern in turn. Patterns that extend
+    a shorter pattern are dropped, since only the presence of a match matters.
+    
+    Args:
+        patterns: Literal substrings to match
+        
+    Returns:
+        Regular expression source matching any of the patterns
+    """
+    trie: Dict[str, dict] = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = {}  # End-of-pattern marker
+    
+    def render(node: Dict[str, dict]) -> str:
+        if '' in node:
+            return ''
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    
+    return render(trie)
+
+
+# Single prefix-factored alternation so a command is scanned once rather than once per pattern
+_DANGEROUS_RE = re.compile(_trie_pattern(_DANGEROUS_PATTERNS))
 
 
 def is_dangerous_command(command: str) -> bool:
@@ -189,39 +591,11 @@ def is_dangerous_command(command: str) -> bool:
     Returns:
         True if command is dangerous, False otherwise
     """
-    dangerous_patterns = [
-        'rm -rf /',
-        'del /f /s /q',
-        'format',
-        'fdisk',
-        'dd if=',
-        'shutdown',
-        'reboot',
-        'halt',
-        'poweroff',
-        'mkfs',
-        'wipefs',
-        'shred',
-        'chown -R',
-        'chmod -R 777',
-        'sudo su',
-        'su root',
-        '> /dev/null',
-        'curl | bash',
-        'wget | bash',
-        'eval $(',
-        'exec(',
-        '$(curl',
-        '$(wget',
-    ]
-    
-    command_lower = command.lower()
-    
-    for pattern in dangerous_patterns:
-        if pattern in command_lower:
-            return True
-    
-    return False
+    return _DANGEROUS_RE.search(command.lower()) is not None
+
+
+# Control characters stripped by sanitize_command (everything below 0x20 except tab/newline/CR)
+_CONTROL_CHAR_TABLE = dict.fromkeys(code for code in range(32) if chr(code) not in '\t\n\r')
 
 
 def sanitize_command(command: str) -> str:
@@ -234,11 +608,8 @@ def sanitize_command(command: str) -> str:
     Returns:
         Sanitized command
     """
-    # Remove null bytes
-    command = command.replace('\x00', '')
-    
-    # Remove control characters
-    command = ''.join(char for char in command if ord(char) >= 32 or char in '\t\n\r')
+    # Remove null bytes and other control characters
+    command = command.translate(_CONTROL_CHAR_TABLE)
     
     # Limit length
     if len(command) > 1000:
@@ -259,19 +630,12 @@ def validate_working_directory(cwd: Union[str, Path], config: Config) -> bool:
         True if directory is safe, False otherwise
     """
     try:
-        cwd_path = Path(cwd).resolve()
-        
         # Check if directory exists
-        if not cwd_path.exists() or not cwd_path.is_dir():
+        if not stat.S_ISDIR(os.stat(cwd).st_mode):
             return False
         
         # Check if directory is within base directory
-        try:
-            cwd_path.relative_to(config.base_dir)
-            return True
-        except ValueError:
-            # Directory is outside base directory
-            return False
+        return is_within_base(cwd, config)
     
     except (OSError, ValueError):
         return False
\ No newline at end of file
@@ -6,9 +6,90 @@ Text processing utilities for Kimi Assistant
 Handles token estimation, text truncation, and content analysis.
 """
 
+import re
+import functools
 from typing import List, Dict, Any, Tuple, Optional
 
 from ..core.config import Config
+from ..core._fastjson import loads as _json_loads
+
+# Optional dependencies, resolved once; None when not installed
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    from rapidfuzz import fuzz as _fuzz
+except ImportError:
+    _fuzz = None
+
+# Batched token counting is used from this many characters of content, with
+# a small fixed thread pool
+_BATCH_ENCODE_MIN_CHARS = 256 * 1024
+_BATCH_ENCODE_THREADS = 4
+
+# Units used by format_file_size, one per power of 1024
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Line boundaries recognised by str.splitlines() other than \n
+_OTHER_LINE_BREAKS_RE = re.compile('[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]')
+
+# Pattern to match fenced markdown code blocks
+_CODE_BLOCK_RE = re.compile(r'```(\w+)?\n(.*?)```', re.DOTALL)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding():
+    """
+    Get the tiktoken encoding used for token estimation.
+    
+    Returns:
+        The cl100k_base encoding, or None if tiktoken is not installed
+    """
+    # Loaded on first use: building the encoding may need to fetch its data
+    if tiktoken is None:
+        return None
+    return tiktoken.get_encoding("cl100k_base")  # GPT-4 encoding
+
+
+def _count_message_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the token count of a single message's content."""
+    # Handle None content (can occur with tool calls)
+    content = message.get("content") or ""
+    
+    encoding = _get_encoding()
+    if encoding is None:
+        # Fallback: rough estimation (1 token ≈ 4 characters)
+        return len(content) // 4
+    return len(encoding.encode(content))
+
+
+def estimate_tokens_per_message(messages: List[Dict[str, Any]]) -> List[int]:
+    """
+    Estimate the token count of each message's content.
+    
+    Args:
+        messages: List of conversation messages
+        
+    Returns:
+        Token count for each message, in the same order
+    """
+    # Handle None content (can occur with tool calls)
+    contents = [message.get("content") or "" for message in messages]
+    
+    encoding = _get_encoding()
+    if encoding is None:
+        # Fallback: rough estimation (1 token ≈ 4 characters)
+        return [len(content) // 4 for content in contents]
+    
+    # encode_batch starts a thread pool on every call, which only pays off
+    # when there is a lot of text to tokenize
+    if len(contents) > 1 and sum(map(len, contents)) >= _BATCH_ENCODE_MIN_CHARS:
+        token_lists = encoding.encode_batch(contents, num_threads=_BATCH_ENCODE_THREADS)
+        return [len(tokens) for tokens in token_lists]
+    
+    return [len(encoding.encode(content)) for content in contents]
 
 
 def estimate_token_usage(conversation_history: List[Dict[str, Any]]) -> Tuple[int, Dict[str, int]]:
@@ -21,56 +102,18 @@ def estimate_token_usage(conversation_history: List[Dict[str, Any]]) -> Tuple[in
     Returns:
         Tuple of (total_tokens, breakdown_by_role)
     """
-    # Try to use tiktoken if available
-    try:
-        import tiktoken
-        encoding = tiktoken.get_encoding("cl100k_base")  # GPT-4 encoding
-        
-        total_tokens = 0
-        breakdown = {"system": 0, "user": 0, "assistant": 0, "tool": 0}
-        
-        for message in conversation_history:
-            role = message.get("role", "unknown")
-            content = message.get("content", "")
-            
-            # Handle None content (can occur with tool calls)
-            if content is None:
-                content = ""
-            
-            # Count tokens
-            tokens = len(encoding.encode(content))
-            total_tokens += tokens
-            
-            if role in breakdown:
-                breakdown[role] += tokens
-            else:
-                breakdown["user"] += tokens  # Default to user
-        
-        return total_tokens, breakdown
-        
-    except ImportError:
-        # Fallback: rough estimation (1 token ≈ 4 characters)
-        total_tokens = 0
-        breakdown = {"system": 0, "user": 0, "assistant": 0, "tool": 0}
-        
-        for message in conversation_history:
-            role = message.get("role", "unknown")
-            content = message.get("content", "")
-            
-            # Handle None content (can occur with tool calls)
-            if content is None:
-                content = ""
-            
-            # Rough estimation
-            tokens = len(content) // 4
-            total_tokens += tokens
-            
-            if role in breakdown:
-                breakdown[role] += tokens
-            else:
-                breakdown["user"] += tokens  # Default to user
+    token_counts = estimate_tokens_per_message(conversation_history)
+    breakdown = {"system": 0, "user": 0, "assistant": 0, "tool": 0}
+    
+    for message, tokens in zip(conversation_history, token_counts):
+        role = message.get("role", "unknown")
         
-        return total_tokens, breakdown
+        if role in breakdown:
+            breakdown[role] += tokens
+        else:
+            breakdown["user"] += tokens  # Default to user
+    
+    return sum(token_counts), breakdown
 
 
 def get_context_usage_info(conversation_history: List[Dict[str, Any]], 
@@ -128,21 +171,21 @@ def smart_truncate_history(conversation_history: List[Dict[str, Any]],
     target_tokens = int(max_tokens * 0.6)  # Use 60% of context for history
     
     # Estimate tokens for system prompt
-    system_tokens, _ = estimate_token_usage([system_prompt])
-    available_tokens = target_tokens - system_tokens
+    available_tokens = target_tokens - _count_message_tokens(system_prompt)
     
-    # Work backwards through messages to keep most recent
-    selected_messages = []
+    # Work backwards through messages to keep most recent; older messages
+    # past the budget are never tokenized
     current_tokens = 0
+    start_index = len(conversation_history)
     
-    for message in reversed(remaining_messages):
-        message_tokens, _ = estimate_token_usage([message])
-        
-        if current_tokens + message_tokens <= available_tokens:
-            selected_messages.insert(0, message)
-            current_tokens += message_tokens
-        else:
+    while start_index > 1:
+        message_tokens = _count_message_tokens(conversation_history[start_index - 1])
+        if current_tokens + message_tokens > available_tokens:
             break
+        current_tokens += message_tokens
+        start_index -= 1
+    
+    selected_messages = conversation_history[start_index:]
     
     # Ensure we have at least some conversation history
     if not selected_messages and remaining_messages:
@@ -182,11 +225,10 @@ def validate_tool_calls(accumulated_tool_calls: List[Dict[str, Any]]) -> List[Di
         if "name" not in function or "arguments" not in function:
             continue
         
-        # Validate arguments is valid JSON
+        # Validate arguments is valid JSON (both parsers' decode errors are ValueErrors)
         try:
-            import json
-            json.loads(function["arguments"])
-        except (json.JSONDecodeError, TypeError):
+            _json_loads(function["arguments"])
+        except (ValueError, TypeError):
             continue
         
         valid_calls.append(call)
@@ -209,7 +251,8 @@ def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
     if len(text) <= max_length:
         return text
     
-    return text[:max_length - len(suffix)] + suffix
+    cutoff = max_length - len(suffix)
+    return f"{text[:cutoff]}{suffix}"
 
 
 def count_lines(text: str) -> int:
@@ -222,7 +265,15 @@ def count_lines(text: str) -> int:
     Returns:
         Number of lines
     """
-    return len(text.splitlines()) if text else 0
+    if not text:
+        return 0
+    
+    # Other line boundaries (\r, \v, \f, \u2028, ...) need splitlines() semantics
+    if _OTHER_LINE_BREAKS_RE.search(text):
+        return len(text.splitlines())
+    
+    newlines = text.count('\n')
+    return newlines if text.endswith('\n') else newlines + 1
 
 
 def extract_code_blocks(text: str, language: Optional[str] = None) -> List[Dict[str, str]]:
@@ -236,14 +287,13 @@ def extract_code_blocks(text: str, language: Optional[str] = None) -> List[Dict[
     Returns:
         List of code blocks with language and content
     """
-    import re
-    
-    # Pattern to match code blocks
-    pattern = r'```(\w+)?\n(.*?)```'
-    matches = re.findall(pattern, text, re.DOTALL)
+    # A block in the requested language must open with this fence
+    if language is not None and f"```{language}\n" not in text:
+        return []
     
     code_blocks = []
-    for lang, content in matches:
+    for match in _CODE_BLOCK_RE.finditer(text):
+        lang, content = match.groups('')
         if language is None or lang == language:
             code_blocks.append({
                 'language': lang or 'text',
@@ -263,11 +313,9 @@ def format_file_size(size_bytes: int) -> str:
     Returns:
         Formatted size string
     """
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.1f} TB"
+    # Each unit is 2**10 of the previous, so the bit length picks the unit directly
+    shift = min((int(size_bytes).bit_length() - 1) // 10, 4) if size_bytes >= 1024 else 0
+    return f"{size_bytes / (1 << (shift * 10)):.1f} {_SIZE_UNITS[shift]}"
 
 
 def similarity_score(text1: str, text2: str) -> float:
@@ -281,21 +329,31 @@ def similarity_score(text1: str, text2: str) -> float:
     Returns:
         Similarity score between 0 and 1
     """
-    try:
-        from thefuzz import fuzz
-        return fuzz.ratio(text1, text2) / 100.0
-    except ImportError:
-        # Simple word-based similarity
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
-        if not words1 and not words2:
-            return 1.0
-        
-        if not words1 or not words2:
-            return 0.0
-        
-        intersection = len(words1 & words2)
-        union = len(words1 | words2)
-        
-        return intersection / union if union > 0 else 0.0
\ No newline at end of file
+    # fuzz.ratio scores two empty texts as 0, the word fallback as 1
+    if not text1 and not text2:
+        return 0.0 if _fuzz is not None else 1.0
+    
+    # Identical texts are fully similar, and nothing is similar to an empty text
+    if text1 == text2:
+        return 1.0
+    if not text1 or not text2:
+        return 0.0
+    
+    if _fuzz is not None:
+        # Whole-number percentages, as thefuzz reported them
+        return round(_fuzz.ratio(text1, text2)) / 100.0
+    
+    # Simple word-based similarity
+    words1 = frozenset(text1.lower().split())
+    words2 = frozenset(text2.lower().split())
+    
+    if not words1 and not words2:
+        return 1.0
+    
+    if not words1 or not words2:
+        return 0.0
+    
+    intersection = len(words1 & words2)
+    union = len(words1 | words2)
+    
+    return intersection / union if union > 0 else 0.0
\ No newline at end of file
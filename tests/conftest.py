@@ -6,74 +6,115 @@ Test configuration and fixtures for Kimi Assistant tests.
 This module provides common fixtures and configuration for all tests.
 """
 
+import os
+import sys
+import types
+import itertools
 import pytest
 import tempfile
 import shutil
 from pathlib import Path
-from unittest.mock import Mock, MagicMock
-from typing import Generator
+from unittest.mock import Mock
+from typing import Generator, Optional
 
 from src.core.config import Config
 from src.core.session import KimiSession
 
 
-@pytest.fixture
-def temp_dir() -> Generator[Path, None, None]:
-    """Create a temporary directory for testing."""
-    temp_path = Path(tempfile.mkdtemp())
+def _temp_root_parent() -> Optional[str]:
+    """Prefer tmpfs for test directories; None means the platform default."""
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK | os.X_OK):
+        return shm
+    return None
+
+
+@pytest.fixture(scope="session")
+def _temp_root() -> Generator[Path, None, None]:
+    """Session-wide parent of every temp_dir, removed once at the end."""
+    root = Path(tempfile.mkdtemp(prefix="kimi-tests-", dir=_temp_root_parent()))
     try:
-        yield temp_path
+        yield root
     finally:
-        shutil.rmtree(temp_path, ignore_errors=True)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+_temp_dir_counter = itertools.count()
 
 
 @pytest.fixture
-def sample_files(temp_dir: Path) -> dict[str, Path]:
-    """Create sample files for testing."""
-    files = {}
-    
-    # Python file
-    python_file = temp_dir / "test.py"
-    python_file.write_text("""#!/usr/bin/env python3
+def temp_dir(_temp_root: Path) -> Path:
+    """Create a fresh temporary directory for testing (cleaned up with the session)."""
+    temp_path = _temp_root / f"t{next(_temp_dir_counter)}"
+    temp_path.mkdir()
+    return temp_path
+
+
+# Files created by sample_dir: key -> (relative path, content)
+_SAMPLE_FILES = {
+    "python": ("test.py", b"""#!/usr/bin/env python3
 
 def hello_world():
     print("Hello, World!")
 
 if __name__ == "__main__":
     hello_world()
-""")
-    files["python"] = python_file
-    
-    # Text file
-    text_file = temp_dir / "readme.txt"
-    text_file.write_text("This is a test file for Kimi Assistant.")
-    files["text"] = text_file
-    
-    # JSON file
-    json_file = temp_dir / "config.json"
-    json_file.write_text('{"name": "test", "version": "1.0"}')
-    files["json"] = json_file
-    
-    # Binary file (simulate)
-    binary_file = temp_dir / "binary.bin"
-    binary_file.write_bytes(b'\x00\x01\x02\x03\xFF\xFE\xFD')
-    files["binary"] = binary_file
+"""),
+    "text": ("readme.txt", b"This is a test file for Kimi Assistant."),
+    "json": ("config.json", b'{"name": "test", "version": "1.0"}'),
+    "binary": ("binary.bin", b'\x00\x01\x02\x03\xFF\xFE\xFD'),
+    "nested": ("subdir/nested.txt", b"Nested file content"),
+}
+
+
+@pytest.fixture(scope="session")
+def sample_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Create sample files once per session in a shared, read-only directory."""
+    root = tmp_path_factory.mktemp("samples")
     
-    # Subdirectory with files
-    sub_dir = temp_dir / "subdir"
-    sub_dir.mkdir()
-    sub_file = sub_dir / "nested.txt"
-    sub_file.write_text("Nested file content")
-    files["nested"] = sub_file
+    for relative_path, content in _SAMPLE_FILES.values():
+        file_path = root / relative_path
+        file_path.parent.mkdir(exist_ok=True)
+        file_path.write_bytes(content)
     
-    return files
+    return root
+
+
+@pytest.fixture(scope="session")
+def sample_files(sample_dir: Path) -> dict[str, Path]:
+    """Paths of the shared sample files; tests must not modify them."""
+    return {key: sample_dir / relative_path for key, (relative_path, _) in _SAMPLE_FILES.items()}
+
+
+@pytest.fixture(scope="session")
+def default_config() -> Config:
+    """Shared default configuration for tests that only read it."""
+    return Config()
 
 
 @pytest.fixture
 def mock_config(temp_dir: Path) -> Config:
     """Create a mock configuration for testing."""
+    return _make_test_config(temp_dir)
+
+
+@pytest.fixture(scope="class")
+def class_mock_config(_temp_root: Path) -> Config:
+    """
+    One mock configuration shared by every test in a class.
+    
+    Tests must only change settings that the class resets between tests,
+    e.g. with an autouse fixture restoring the exclusions.
+    """
+    base_dir = _temp_root / f"c{next(_temp_dir_counter)}"
+    base_dir.mkdir()
+    return _make_test_config(base_dir)
+
+
+def _make_test_config(base_dir: Path) -> Config:
+    """Build the configuration used by mock_config and class_mock_config."""
     config = Config()
-    config.base_dir = temp_dir
+    config.base_dir = base_dir.resolve()
     config.fuzzy_available = True
     config.fuzzy_enabled_by_default = False
     config.max_file_content_size_create = 1024 * 1024
@@ -83,6 +124,67 @@ def mock_config(temp_dir: Path) -> Config:
     return config
 
 
+class MockXaiResponse:
+    """Canned response returned by MockXaiChat.sample()."""
+    
+    def __init__(self):
+        self.content = "Mock response"
+        self.tool_calls = []
+
+
+class MockXaiChat:
+    """Chat object returned by MockXaiClient.chat.create()."""
+    
+    def append(self, message):
+        pass
+    
+    def sample(self):
+        return MockXaiResponse()
+
+
+class MockXaiClient:
+    """Stand-in for xai_sdk.Client."""
+    
+    def __init__(self, api_key):
+        self.api_key = api_key
+    
+    class chat:
+        @staticmethod
+        def create(model, tools):
+            return MockXaiChat()
+
+
+def _build_xai_sdk_modules() -> dict:
+    """Build stand-in ``xai_sdk`` and ``xai_sdk.chat`` modules."""
+    chat_module = types.ModuleType('xai_sdk.chat')
+    chat_module.tool = lambda name, description, parameters: {
+        'name': name, 'description': description, 'parameters': parameters
+    }
+    for role in ('user', 'system', 'assistant', 'tool_result'):
+        setattr(chat_module, role, lambda content: content)
+    
+    sdk_module = types.ModuleType('xai_sdk')
+    sdk_module.Client = MockXaiClient
+    sdk_module.chat = chat_module
+    return {'xai_sdk': sdk_module, 'xai_sdk.chat': chat_module}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def xai_sdk_mock():
+    """Install the xai_sdk stand-in once for the whole test session."""
+    modules = _build_xai_sdk_modules()
+    saved = {name: sys.modules.get(name) for name in modules}
+    sys.modules.update(modules)
+    try:
+        yield modules['xai_sdk']
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
 @pytest.fixture
 def mock_client():
     """Create a mock xAI client for testing."""
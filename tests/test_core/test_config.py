@@ -10,17 +10,25 @@ import pytest
 import json
 import tempfile
 from pathlib import Path
-from unittest.mock import patch, mock_open
+from unittest.mock import patch
 
 from src.core.config import Config
 
 
+EXPECTED_EXCLUDED_FILES = frozenset({".DS_Store", ".git", "__pycache__"})
+EXPECTED_EXCLUDED_EXTENSIONS = frozenset({".pyc", ".png", ".log"})
+EXPECTED_TOOL_NAMES = frozenset({
+    "read_file", "read_multiple_files", "create_file", 
+    "create_multiple_files", "edit_file", "run_bash", "run_powershell"
+})
+
+
 class TestConfig:
     """Test the Config class."""
     
-    def test_config_initialization(self):
+    def test_config_initialization(self, default_config):
         """Test basic config initialization."""
-        config = Config()
+        config = default_config
         
         # Check default values
         assert config.base_dir == Path.cwd()
@@ -37,9 +45,9 @@ class TestConfig:
         
         assert config.base_dir == temp_dir.resolve()
         
-    def test_os_info_detection(self):
+    def test_os_info_detection(self, default_config):
         """Test OS information detection."""
-        config = Config()
+        config = default_config
         
         # OS info should be populated
         assert 'system' in config.os_info
@@ -86,9 +94,9 @@ class TestConfig:
         assert config.git_branch is None
         assert config.git_skip_staging is False
         
-    def test_max_tokens_for_model(self):
+    def test_max_tokens_for_model(self, default_config):
         """Test token limit retrieval for different models."""
-        config = Config()
+        config = default_config
         
         # Test known models
         assert config.get_max_tokens_for_model("grok-3") == 128000
@@ -97,31 +105,31 @@ class TestConfig:
         # Test unknown model (should return default)
         assert config.get_max_tokens_for_model("unknown-model") == 128000
         
-    def test_file_exclusions(self):
+    def test_file_exclusions(self, default_config):
         """Test file exclusion patterns."""
-        config = Config()
+        config = default_config
         
         # Should have default exclusions
-        assert ".DS_Store" in config.excluded_files
-        assert ".git" in config.excluded_files
-        assert "__pycache__" in config.excluded_files
+        missing_files = EXPECTED_EXCLUDED_FILES - config.excluded_files
+        assert not missing_files, missing_files
         
-        assert ".pyc" in config.excluded_extensions
-        assert ".png" in config.excluded_extensions
-        assert ".log" in config.excluded_extensions
+        missing_extensions = EXPECTED_EXCLUDED_EXTENSIONS - config.excluded_extensions
+        assert not missing_extensions, missing_extensions
         
-    @patch('builtins.open', new_callable=mock_open, read_data='{"models": {"default_model": "custom-grok"}}')
-    @patch('pathlib.Path.exists', return_value=True)
-    def test_config_file_loading(self, mock_exists, mock_file):
+    def test_config_file_loading(self, temp_dir):
         """Test loading configuration from file."""
-        config = Config()
+        config_file = temp_dir / "config.json"
+        config_file.write_bytes(b'{"models": {"default_model": "custom-grok"}}')
+        
+        config = Config(config_path=config_file)
         
         # Should load custom model from config
         assert config.default_model == "custom-grok"
+        assert config.config_file == config_file
         
-    def test_system_prompt_generation(self):
+    def test_system_prompt_generation(self, default_config):
         """Test system prompt generation."""
-        config = Config()
+        config = default_config
         prompt = config.get_system_prompt()
         
         # Should contain expected content
@@ -129,71 +137,66 @@ class TestConfig:
         assert config.os_info['system'] in prompt
         assert "Capabilities" in prompt
         
-    def test_tools_generation(self):
+    def test_tools_generation(self, default_config):
         """Test tool definitions."""
-        config = Config()
+        config = default_config
         tools = config.get_tools()
         
         # Should have expected tools
-        tool_names = [tool.function.name for tool in tools]
-        expected_tools = [
-            "read_file", "read_multiple_files", "create_file", 
-            "create_multiple_files", "edit_file", "run_bash", "run_powershell"
-        ]
-        
-        for expected_tool in expected_tools:
-            assert expected_tool in tool_names
+        tool_names = {tool.function.name for tool in tools}
+        missing = EXPECTED_TOOL_NAMES - tool_names
+        assert not missing, missing
 
 
 class TestConfigWithFiles:
     """Test Config class with file operations."""
     
-    def test_config_file_not_found(self):
+    def test_config_file_not_found(self, temp_dir):
         """Test behavior when config file doesn't exist."""
-        with patch('pathlib.Path.exists', return_value=False):
-            config = Config()
-            # Should use defaults when file doesn't exist
-            assert config.default_model == "grok-3"
+        config = Config(config_path=temp_dir / "missing.json")
+        # Should use defaults when file doesn't exist
+        assert config.default_model == "grok-3"
             
-    def test_invalid_config_file(self):
+    def test_invalid_config_file(self, temp_dir):
         """Test behavior with invalid JSON config."""
-        with patch('builtins.open', new_callable=mock_open, read_data='invalid json'):
-            with patch('pathlib.Path.exists', return_value=True):
-                config = Config()
-                # Should use defaults when JSON is invalid
-                assert config.default_model == "grok-3"
+        config_file = temp_dir / "config.json"
+        config_file.write_bytes(b'invalid json')
+        
+        config = Config(config_path=config_file)
+        # Should use defaults when JSON is invalid
+        assert config.default_model == "grok-3"
                 
-    def test_partial_config_file(self):
+    def test_partial_config_file(self, temp_dir):
         """Test behavior with partial config file."""
         partial_config = {
             "file_limits": {"max_files_in_add_dir": 500},
             "security": {"require_bash_confirmation": False}
         }
+        config_file = temp_dir / "config.json"
+        config_file.write_bytes(json.dumps(partial_config).encode())
         
-        with patch('builtins.open', new_callable=mock_open, read_data=json.dumps(partial_config)):
-            with patch('pathlib.Path.exists', return_value=True):
-                config = Config()
-                
-                # Should apply partial config
-                assert config.max_files_in_add_dir == 500
-                assert config.require_bash_confirmation is False
-                
-                # Should keep defaults for unspecified values
-                assert config.default_model == "grok-3"
+        config = Config(config_path=config_file)
+        
+        # Should apply partial config
+        assert config.max_files_in_add_dir == 500
+        assert config.require_bash_confirmation is False
+        
+        # Should keep defaults for unspecified values
+        assert config.default_model == "grok-3"
 
 
 @pytest.mark.security
 class TestConfigSecurity:
     """Test security-related configuration."""
     
-    def test_fuzzy_matching_disabled_by_default(self):
+    def test_fuzzy_matching_disabled_by_default(self, default_config):
         """Test that fuzzy matching is disabled by default for security."""
-        config = Config()
+        config = default_config
         assert config.fuzzy_enabled_by_default is False
         
-    def test_confirmation_enabled_by_default(self):
+    def test_confirmation_enabled_by_default(self, default_config):
         """Test that shell confirmations are enabled by default."""
-        config = Config()
+        config = default_config
         assert config.require_bash_confirmation is True
         assert config.require_powershell_confirmation is True
         
@@ -220,7 +223,7 @@ class TestConfigIntegration:
             "fuzzy_matching": {"enabled_by_default": True},
             "excluded_files": ["test.tmp"]
         }
-        config_file.write_text(json.dumps(config_data))
+        config_file.write_bytes(json.dumps(config_data).encode())
         
         # Point config to our test file
         with patch.object(Path, 'parent', new_callable=lambda: temp_dir):
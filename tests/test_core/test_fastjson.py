@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""
+Tests for src.core._fastjson module.
+
+Tests that the JSON helpers match the standard library on both backends.
+"""
+
+import json
+import pytest
+
+from src.core import _fastjson
+
+
+SAMPLE = {
+    "files": [{"path": "docs/café.md", "content": "naïve 😀\nline", "size": 12}],
+    "ok": True,
+    "missing": None,
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    """Run a test with orjson (when installed) and with the stdlib fallback."""
+    if request.param == "orjson":
+        if _fastjson.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(_fastjson, "orjson", None)
+    return request.param
+
+
+class TestDumps:
+    """Test JSON serialization."""
+    
+    def test_pretty_matches_json_dumps(self, backend):
+        """Test that pretty output equals json.dumps(indent=2), ASCII escapes included."""
+        assert _fastjson.dumps(SAMPLE, pretty=True) == json.dumps(SAMPLE, indent=2)
+        
+    def test_compact_output(self, backend):
+        """Test that compact output has no spaces after separators."""
+        assert _fastjson.dumps(SAMPLE) == json.dumps(SAMPLE, separators=(",", ":"))
+        
+    def test_unescaped_output(self, backend):
+        """Test that ensure_ascii=False leaves non-ASCII characters as they are."""
+        assert _fastjson.dumps(SAMPLE, ensure_ascii=False) == json.dumps(
+            SAMPLE, separators=(",", ":"), ensure_ascii=False
+        )
+        
+    def test_non_string_keys_and_big_integers(self, backend):
+        """Test that data orjson rejects is serialized like json.dumps."""
+        data = {1: 2, "big": 2 ** 70}
+        
+        assert _fastjson.dumps(data, pretty=True) == json.dumps(data, indent=2)
+        
+    def test_unserializable_object(self, backend):
+        """Test that unsupported objects still raise TypeError."""
+        with pytest.raises(TypeError):
+            _fastjson.dumps({"value": object()})
\ No newline at end of file
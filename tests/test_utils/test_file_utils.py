@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+"""
+Tests for src.utils.file_utils module.
+
+Tests encoding detection, exact and fuzzy diff edits and the atomic file
+rewrite behind them.
+"""
+
+import os
+import sys
+import stat
+import pytest
+
+from src.utils import file_utils
+from src.utils.file_utils import (
+    apply_fuzzy_diff_edit, safe_file_read, detect_file_encoding, _atomic_write_text
+)
+
+
+@pytest.mark.utils
+class TestApplyFuzzyDiffEdit:
+    """Test applying snippet edits to files."""
+    
+    def test_exact_single_match(self, mock_config, temp_dir):
+        """Test that a single exact match is replaced in place."""
+        test_file = temp_dir / "module.py"
+        test_file.write_text("def a():\n    return 1\n\ndef b():\n    return 2\n")
+        
+        apply_fuzzy_diff_edit(str(test_file), "    return 2", "    return 3", mock_config)
+        
+        assert test_file.read_text() == "def a():\n    return 1\n\ndef b():\n    return 3\n"
+        
+    def test_snippet_not_found_without_fuzzy(self, mock_config, temp_dir):
+        """Test that a missing snippet fails when fuzzy matching is disabled."""
+        test_file = temp_dir / "module.py"
+        test_file.write_text("x = 1\n")
+        
+        with pytest.raises(ValueError, match="Original snippet not found"):
+            apply_fuzzy_diff_edit(str(test_file), "y = 2", "y = 3", mock_config)
+        assert test_file.read_text() == "x = 1\n"
+        
+    def test_fuzzy_single_match(self, mock_config, temp_dir):
+        """Test that a close fuzzy match is replaced."""
+        mock_config.fuzzy_enabled_by_default = True
+        test_file = temp_dir / "module.py"
+        test_file.write_text("alpha = 1\nresult = compute_total(items)\nomega = 2\n")
+        
+        apply_fuzzy_diff_edit(str(test_file), "result = compute_totals(items)", "result = 0", mock_config)
+        
+        assert test_file.read_text() == "alpha = 1\nresult = 0\nomega = 2\n"
+        
+    def test_fuzzy_ambiguous_match_refused(self, mock_config, temp_dir):
+        """Test that a fuzzy snippet matching several places is refused."""
+        mock_config.fuzzy_enabled_by_default = True
+        content = "result = compute_total(items)\nother = 1\nresult = compute_total(items)\n"
+        test_file = temp_dir / "module.py"
+        test_file.write_text(content)
+        
+        with pytest.raises(ValueError, match="Ambiguous fuzzy edit"):
+            apply_fuzzy_diff_edit(str(test_file), "result = compute_totals(items)", "result = 0", mock_config)
+        assert test_file.read_text() == content
+        
+    def test_fuzzy_score_is_rounded_before_threshold(self, mock_config, temp_dir):
+        """Test that a score just below the threshold passes once rounded."""
+        mock_config.fuzzy_enabled_by_default = True
+        mock_config.min_edit_score = 85
+        test_file = temp_dir / "letters.txt"
+        test_file.write_text("abcdefghijkXX\n")
+        
+        # fuzz.ratio scores this pair at 84.6
+        apply_fuzzy_diff_edit(str(test_file), "abcdefghijklm", "replaced", mock_config)
+        
+        assert test_file.read_text() == "replaced\n"
+
+
+@pytest.mark.utils
+class TestAtomicWriteText:
+    """Test atomic file rewrites."""
+    
+    def test_writes_parts_in_order(self, temp_dir):
+        """Test that the parts form the new content."""
+        test_file = temp_dir / "file.txt"
+        test_file.write_text("old")
+        
+        _atomic_write_text(str(test_file), ("a", "b", "c"))
+        
+        assert test_file.read_text() == "abc"
+        
+    @pytest.mark.skipif(sys.platform == "win32", reason="POSIX permission bits")
+    def test_preserves_mode(self, temp_dir):
+        """Test that the original permission bits are kept."""
+        test_file = temp_dir / "script.sh"
+        test_file.write_text("echo old\n")
+        os.chmod(test_file, 0o751)
+        
+        _atomic_write_text(str(test_file), ("echo new\n",))
+        
+        assert stat.S_IMODE(os.stat(test_file).st_mode) == 0o751
+        assert test_file.read_text() == "echo new\n"
+        
+    def test_leaves_no_temporary_file(self, temp_dir):
+        """Test that the temporary file is gone after success and failure."""
+        test_file = temp_dir / "file.txt"
+        test_file.write_text("old")
+        
+        def failing_parts():
+            yield "partial"
+            raise RuntimeError("interrupted")
+        
+        _atomic_write_text(str(test_file), ("new",))
+        with pytest.raises(RuntimeError):
+            _atomic_write_text(str(test_file), failing_parts())
+        
+        assert test_file.read_text() == "new"
+        assert sorted(path.name for path in temp_dir.iterdir()) == ["file.txt"]
+
+
+
+@pytest.mark.utils
+class TestEncodingDetection:
+    """Test encoding detection for non-ASCII files."""
+    
+    def test_utf8_character_straddling_peek_boundary(self, temp_dir):
+        """Test that a multi-byte character cut off by the peek is still UTF-8."""
+        content = "a" * 8191 + "日本語のテキスト\n"
+        test_file = temp_dir / "notes.txt"
+        test_file.write_bytes(content.encode("utf-8"))
+        
+        result = safe_file_read(str(test_file))
+        
+        assert result["success"]
+        assert result["encoding_info"]["detected_encoding"] == "utf-8"
+        assert result["content"] == content
+        assert result["warnings"] == []
+        
+    def test_japanese_utf8_text(self, temp_dir):
+        """Test that short non-ASCII UTF-8 text is detected confidently."""
+        test_file = temp_dir / "japanese.txt"
+        test_file.write_bytes("こんにちは、世界\n".encode("utf-8"))
+        
+        encoding, confidence = detect_file_encoding(str(test_file))
+        
+        assert encoding == "utf-8"
+        assert confidence >= 0.8
+        
+    def test_non_utf8_text_is_not_utf8(self, temp_dir):
+        """Test that bytes that are invalid UTF-8 are left to the detectors."""
+        test_file = temp_dir / "latin1.txt"
+        test_file.write_bytes("café crème brûlée\n".encode("latin-1"))
+        
+        encoding, _ = detect_file_encoding(str(test_file))
+        
+        assert encoding.lower().replace("_", "-") != "utf-8"
+
+
+@pytest.mark.utils
+class TestSafeFileRead:
+    """Test reading files, including relative to a directory descriptor."""
+    
+    @pytest.mark.skipif(not file_utils._DIR_FD_SUPPORTED, reason="needs dir_fd support")
+    def test_detection_cache_ignores_dir_fd(self, temp_dir, monkeypatch):
+        """Test that reads through different directory fds share one detection."""
+        test_file = temp_dir / "notes.txt"
+        test_file.write_text("héllo\n", encoding="utf-8")
+        
+        calls = []
+        run_detection = file_utils._run_detection
+        monkeypatch.setattr(file_utils, "_run_detection",
+                            lambda *args: calls.append(args) or run_detection(*args))
+        
+        # Two descriptors open at once always have different numbers
+        dir_fds = [os.open(temp_dir, os.O_RDONLY | os.O_DIRECTORY) for _ in range(2)]
+        try:
+            for dir_fd in dir_fds:
+                result = safe_file_read(str(test_file), dir_fd=dir_fd)
+                assert result["content"] == "héllo\n"
+        finally:
+            for dir_fd in dir_fds:
+                os.close(dir_fd)
+        
+        assert len(calls) == 1
\ No newline at end of file
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""
+Tests for src.utils.shell_utils module.
+
+Tests the pooled bash process used to run shell commands on POSIX.
+"""
+
+import os
+import time
+import shutil
+import threading
+import subprocess
+import pytest
+
+from src.utils.shell_utils import _ShellPool, _MAX_OUTPUT_BYTES
+
+
+BASH = shutil.which("bash")
+
+pytestmark = pytest.mark.skipif(os.name != "posix" or BASH is None,
+                                reason="the shell pool needs POSIX pipes and bash")
+
+
+@pytest.fixture
+def shell_pool():
+    """A fresh shell pool, closed after the test."""
+    pool = _ShellPool()
+    yield pool
+    pool.close()
+
+
+@pytest.mark.utils
+class TestShellPool:
+    """Test running commands in the pooled shell."""
+    
+    def test_exit_codes(self, shell_pool, temp_dir):
+        """Test that each command's exit status is reported."""
+        assert shell_pool.run("true", str(temp_dir), 5, BASH) == ("", "", 0)
+        assert shell_pool.run("exit 7", str(temp_dir), 5, BASH)[2] == 7
+        
+        stdout, stderr, returncode = shell_pool.run("echo out; echo err >&2; false", str(temp_dir), 5, BASH)
+        assert (stdout, stderr, returncode) == ("out\n", "err\n", 1)
+        
+    def test_state_is_isolated_between_calls(self, shell_pool, temp_dir):
+        """Test that cd, exports and variables do not leak into the next command."""
+        shell_pool.run("cd /; export KIMI_TEST_VAR=leaked; kimi_test_local=leaked", str(temp_dir), 5, BASH)
+        
+        stdout, _, returncode = shell_pool.run(
+            'pwd; echo "${KIMI_TEST_VAR-unset} ${kimi_test_local-unset}"', str(temp_dir), 5, BASH
+        )
+        
+        assert returncode == 0
+        assert stdout == f"{os.path.realpath(temp_dir)}\nunset unset\n"
+        
+    def test_stdin_is_detached(self, shell_pool, temp_dir):
+        """Test that a command reading stdin sees end-of-file."""
+        stdout, _, returncode = shell_pool.run("cat; echo done", str(temp_dir), 5, BASH)
+        
+        assert (stdout, returncode) == ("done\n", 0)
+        
+    def test_timeout_kills_process_group(self, shell_pool, temp_dir):
+        """Test that a timeout kills the shell and the commands it started."""
+        pid_file = temp_dir / "pid"
+        
+        with pytest.raises(subprocess.TimeoutExpired):
+            shell_pool.run(f"sleep 30 & echo $! > {pid_file}; wait", str(temp_dir), 0.5, BASH)
+        
+        background_pid = int(pid_file.read_text())
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                os.kill(background_pid, 0)
+            except ProcessLookupError:
+                break
+            time.sleep(0.05)
+        else:
+            pytest.fail("background process survived the timeout")
+        
+        # The pool starts a new shell for the next command
+        assert shell_pool.run("echo again", str(temp_dir), 5, BASH) == ("again\n", "", 0)
+        
+    def test_output_is_capped(self, shell_pool, temp_dir):
+        """Test that output beyond 1 MiB is dropped with a note."""
+        stdout, _, returncode = shell_pool.run(
+            f"head -c {2 * _MAX_OUTPUT_BYTES} /dev/zero | tr '\\0' a", str(temp_dir), 10, BASH
+        )
+        
+        assert returncode == 0
+        assert stdout == "a" * _MAX_OUTPUT_BYTES + "\n... [output truncated at 1 MiB]"
+        
+    def test_background_output_stays_with_its_command(self, shell_pool, temp_dir):
+        """Test that output written by a background job after the command ends is not given to the next command."""
+        first = shell_pool.run("sleep 0.1; echo late &", str(temp_dir), 5, BASH)
+        second = shell_pool.run("echo second", str(temp_dir), 5, BASH)
+        
+        assert first == ("late\n", "", 0)
+        assert second == ("second\n", "", 0)
+        
+        # A background job still writing after the subshell exits
+        first = shell_pool.run("(sleep 0.2; echo late; echo oops >&2) & echo early", str(temp_dir), 5, BASH)
+        second = shell_pool.run("echo second", str(temp_dir), 5, BASH)
+        
+        assert first == ("early\nlate\n", "oops\n", 0)
+        assert second == ("second\n", "", 0)
+        
+    def test_marker_split_across_reads(self):
+        """Test that an end marker arriving in two reads is still recognized."""
+        marker = b"__KIMI_END_test__"
+        shell_read, shell_write = os.pipe()
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        hold_fds = [os.dup(stdout_write), os.dup(stderr_write)]
+        
+        def write_rest():
+            os.write(shell_write, marker[5:] + b"3\n")
+        
+        try:
+            os.write(stdout_write, b"output\n")
+            os.write(stderr_write, b"errors\n")
+            os.close(stdout_write)
+            os.close(stderr_write)
+            os.write(shell_write, marker[:5])
+            writer = threading.Timer(0.2, write_rest)
+            writer.start()
+            
+            result = _ShellPool._read_command_output(
+                shell_read, [stdout_read, stderr_read], hold_fds, marker, "test", 5
+            )
+            writer.join()
+        finally:
+            for fd in (shell_read, shell_write, stdout_read, stderr_read, *hold_fds):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        
+        assert result == (b"output\n", b"errors\n", b"3")
+        assert hold_fds == []
\ No newline at end of file
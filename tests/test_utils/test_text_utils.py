@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+"""
+Tests for src.utils.text_utils module.
+
+Tests text similarity scoring.
+"""
+
+import pytest
+
+from src.utils import text_utils
+from src.utils.text_utils import similarity_score
+
+
+@pytest.mark.utils
+class TestSimilarityScore:
+    """Test similarity scoring between texts."""
+    
+    def test_identical_texts(self):
+        """Test that identical non-empty texts are fully similar."""
+        assert similarity_score("hello world", "hello world") == 1.0
+        
+    def test_empty_texts(self):
+        """Test that two empty texts score 0 with fuzzy scoring, as thefuzz did."""
+        assert similarity_score("", "") == 0.0
+        assert similarity_score("", "text") == 0.0
+        
+    def test_empty_texts_word_fallback(self, monkeypatch):
+        """Test that the word-based fallback treats two empty texts as identical."""
+        monkeypatch.setattr(text_utils, "_fuzz", None)
+        
+        assert similarity_score("", "") == 1.0
+        assert similarity_score("", "text") == 0.0
+        
+    def test_scores_are_whole_percentages(self):
+        """Test that fuzzy scores are rounded like thefuzz's integer ratios."""
+        # fuzz.ratio scores this pair at 84.6
+        assert similarity_score("abcdefghijklm", "abcdefghijkXX") == 0.85
\ No newline at end of file